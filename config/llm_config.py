@@ -3,10 +3,21 @@ from __future__ import annotations
 import json
 import logging
 from dataclasses import dataclass, field
-from typing import Any, Dict, Iterable, List, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+try:
+    import orjson
+except Exception:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+_EMPTY_PAYLOAD: Mapping[str, Any] = MappingProxyType({})
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one except clause covers both
+_json_loads = orjson.loads if orjson is not None else json.loads
+
 
 @dataclass(frozen=True)
 class LLMProfile:
@@ -15,12 +26,25 @@ class LLMProfile:
     system_prompt: str
     temperature: float
     max_tokens: int
-    response_format: Optional[Dict[str, Any]] = None
-    extra_payload: Dict[str, Any] = field(default_factory=dict)
+    response_format: Optional[Mapping[str, Any]] = None
+    extra_payload: Mapping[str, Any] = field(default_factory=lambda: _EMPTY_PAYLOAD)
+    _base_payload: Dict[str, Any] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        """Prekompiluje niezmienną część payloadu (frozen -> object.__setattr__)."""
+        base: Dict[str, Any] = {
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+        }
+        if self.response_format:
+            base["response_format"] = self.response_format
+        if self.extra_payload:
+            base.update(self.extra_payload)
+        object.__setattr__(self, "_base_payload", base)
 
     def apply_system_prompt(self, messages: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Dodaje system prompt na początku listy wiadomości"""
-        messages_list = list(messages)
+        messages_list = messages if isinstance(messages, list) else list(messages)
         if messages_list and (messages_list[0].get("role") == "system"):
             return messages_list
         return [{"role": "system", "content": self.system_prompt}, *messages_list]
@@ -34,20 +58,13 @@ class LLMProfile:
             overrides: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """Tworzy payload kompatybilny z OpenAI/LM Studio."""
-        payload: Dict[str, Any] = {
+        return {
             "model": model,
             "messages": self.apply_system_prompt(messages),
-            "temperature": self.temperature,
-            "max_tokens": self.max_tokens,
             "stream": stream,
+            **self._base_payload,
+            **(overrides or {}),
         }
-        if self.response_format:
-            payload["response_format"] = self.response_format
-        if self.extra_payload:
-            payload.update(self.extra_payload)
-        if overrides:
-            payload.update(overrides)
-        return payload
 
 PROCEDURE_EXTRACTION_SCHEMA = {
     "type": "object",
@@ -160,14 +177,22 @@ PROFILES: Dict[str, LLMProfile] = {
 }
 
 
+@lru_cache(maxsize=None)
 def get_profile(name: str) -> LLMProfile:
     return PROFILES[name]
 
 
+_TOON_HEADER = "idx|title|score|source"
+_TOON_TEXT_TABLE = str.maketrans({"\r": " ", "\n": " "})
+_TOON_FIELD_TABLE = str.maketrans({"\r": " ", "\n": " ", "|": "/"})
+
 
 def convert_to_toon_format(context_data: Dict[str, Any]) -> str:
     """
     Convert context data to TOON (Token-Optimized Object Notation) format.
+
+    Search results are emitted columnar: the field header is declared once,
+    then one pipe-delimited row per result with its text indented below.
     """
     if not context_data:
         return "Brak kontekstu."
@@ -177,7 +202,8 @@ def convert_to_toon_format(context_data: Dict[str, Any]) -> str:
         if not results:
             return "Brak wyników wyszukiwania."
 
-        toon_lines = []
+        toon_lines: List[Optional[str]] = [None] * (len(results) + 1)
+        toon_lines[0] = _TOON_HEADER
         for idx, result in enumerate(results, 1):
             breadcrumbs = result.get("title", [])
             if isinstance(breadcrumbs, list):
@@ -186,16 +212,16 @@ def convert_to_toon_format(context_data: Dict[str, Any]) -> str:
                 breadcrumb_str = str(breadcrumbs) if breadcrumbs else "Brak tytułu"
 
             score = result.get("score", 0.0)
-            header = f"[{idx}] {breadcrumb_str} (score: {score:.2f})"
-
-            text = result.get("text", "").strip()
-
             source = result.get("source", "")
+            row = (
+                f"{idx}|{breadcrumb_str.translate(_TOON_FIELD_TABLE)}|{score:.2f}|"
+                f"{str(source).translate(_TOON_FIELD_TABLE)}"
+            )
 
-            block = f"{header}\n{text}\nŹródło: {source}"
-            toon_lines.append(block)
+            text = (result.get("text") or "").translate(_TOON_TEXT_TABLE).strip()
+            toon_lines[idx] = f"{row}\n  {text}" if text else row
 
-        return "\n\n".join(toon_lines)
+        return "\n".join(toon_lines)
 
     elif context_data.get("info"):
         return context_data["info"]
@@ -225,23 +251,18 @@ def build_runtime_messages(
 def parse_structured_response(content: str) -> Optional[Dict[str, Any]]:
     """Parses LLM answer (string JSON) to Python dictionary."""
     try:
-        data = json.loads(content)
-        if not isinstance(data, dict):
-            return None
-
-        if "reply_to_user" not in data:
-            data["reply_to_user"] = "Przepraszam, wystąpił błąd formatowania odpowiedzi."
-
-        if "citations" not in data:
-            data["citations"] = []
-
-        if "downloads" not in data:
-            data["downloads"] = []
-
-        return data
+        data = _json_loads(content)
     except json.JSONDecodeError:
         logger.error(f"Failed to parse LLM JSON response. Content preview: {content[:100]}...")
         return None
+    if not isinstance(data, dict):
+        return None
+
+    data.setdefault("reply_to_user", "Przepraszam, wystąpił błąd formatowania odpowiedzi.")
+    data.setdefault("citations", [])
+    data.setdefault("downloads", [])
+
+    return data
 
 
 def build_custom_payload(structured: Dict[str, Any]) -> Dict[str, Any]:
@@ -1,13 +1,19 @@
 from __future__ import annotations
 from pathlib import Path
-import os, json, re, hashlib, unicodedata
-from typing import Any, Dict, List, Optional
+import os, sys, json, re, hashlib, unicodedata
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from urllib.parse import urlsplit, urlunsplit, quote
 from dotenv import load_dotenv
 load_dotenv()
 import psycopg
-from psycopg.rows import dict_row
+from psycopg.rows import dict_row, tuple_row
+
+try:
+    import orjson
+except Exception:
+    orjson = None
 
 BASE_DIR = Path(__file__).resolve().parent
 CATALOG_DIR = BASE_DIR / "neon_data"
@@ -18,15 +24,27 @@ UNITS_JSON       = CATALOG_DIR / "units.json"
 PROCEDURES_JSON  = CATALOG_DIR / "procedures.json"
 CATALOG_JSON      = CATALOG_DIR / "catalog.json"
 
+_FETCH_ITERSIZE = 10_000
+
+
+def _password_is_quoted(netloc: str) -> bool:
+    creds, at, _ = netloc.partition("@")
+    if not at:
+        return True
+    _, colon, pwd = creds.partition(":")
+    return not colon or quote(pwd, safe='') == pwd
 
 def as_psycopg_url(url: str) -> str:
     if url.startswith("postgresql+psycopg://"):
-        url = "postgresql://" + url.split("postgresql+psycopg://", 1)[1]
+        url = "postgresql://" + url[len("postgresql+psycopg://"):]
     parts = urlsplit(url)
+    if "sslmode=" in parts.query and _password_is_quoted(parts.netloc):
+        # already normalised: nothing to rebuild
+        return url
     if "@" in parts.netloc:
-        creds, host = parts.netloc.split("@", 1)
+        creds, _, host = parts.netloc.partition("@")
         if ":" in creds:
-            user, pwd = creds.split(":", 1)
+            user, _, pwd = creds.partition(":")
             creds = f"{user}:{quote(pwd, safe='')}"
         netloc = f"{creds}@{host}"
     else:
@@ -43,20 +61,36 @@ def connect_db() -> psycopg.Connection:
     return psycopg.connect(as_psycopg_url(db_url), row_factory=dict_row)
 
 
-_WS_RE = re.compile(r"\s+")
 _NON_DIGIT_RE = re.compile(r"\D+")
+_ASCII_NON_DIGITS = str.maketrans("", "", "".join(chr(c) for c in range(128) if not chr(c).isdigit()))
+# Polish letters that NFKD decomposes into base + combining mark ("ł" does not, so it stays).
+_FOLD_TABLE = str.maketrans("ąćęńóśźż", "acenoszz")
 
 def fold_text(s: str) -> str:
-    s = (s or "").strip().lower()
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(ch for ch in s if not unicodedata.combining(ch))
-    s = _WS_RE.sub(" ", s).strip()
-    return s
+    s = (s or "").lower().translate(_FOLD_TABLE)
+    if not s.isascii():
+        s = unicodedata.normalize("NFKD", s)
+        s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return " ".join(s.split())
+
+def strip_or_empty(s: Optional[str]) -> str:
+    # Python-side: str.strip() drops every Unicode whitespace (tabs, newlines, NBSP...),
+    # SQL TRIM() only drops the plain space
+    return (s or "").strip()
+
+def person_names(full_name: Optional[str], first_name: Optional[str], last_name: Optional[str]) -> Tuple[str, str, str]:
+    """(full_name, first_name, last_name) stripped; full_name falls back to "first last"."""
+    first, last = strip_or_empty(first_name), strip_or_empty(last_name)
+    full = strip_or_empty(full_name) or f"{first} {last}".strip()
+    return full, first, last
 
 def phone_to_nsn9(s: str) -> Optional[str]:
     if not s:
         return None
-    digits = _NON_DIGIT_RE.sub("", s)
+    if s.isascii():
+        digits = s.translate(_ASCII_NON_DIGITS)
+    else:
+        digits = _NON_DIGIT_RE.sub("", s)
     if len(digits) >= 9:
         return digits[-9:]
     return None
@@ -74,82 +108,153 @@ def split_multi(value: Optional[str]) -> List[str]:
 def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat(timespec="seconds")
 
-def atomic_write_json(path: Path, obj: Any) -> None:
+# shared stdlib encoder for the no-orjson path; catalog data (DB rows) is acyclic
+_ENCODER = json.JSONEncoder(ensure_ascii=False, indent=2, check_circular=False)
+
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
     tmp = path.with_suffix(path.suffix + ".tmp")
-    with tmp.open("w", encoding="utf-8") as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
+    tmp.write_bytes(data)
     tmp.replace(path)
 
-def sha1_of_obj(obj: Any) -> str:
-    data = json.dumps(obj, ensure_ascii=False, sort_keys=True).encode("utf-8")
-    return hashlib.sha1(data).hexdigest()
+def _write_json(path: Path, obj: Any, hasher: Optional[Any] = None) -> None:
+    if orjson is not None:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        if hasher is not None:
+            hasher.update(data)
+        _atomic_write_bytes(path, data)
+        return
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("wb") as f:
+        for chunk in _ENCODER.iterencode(obj):
+            b = chunk.encode("utf-8")
+            if hasher is not None:
+                hasher.update(b)
+            f.write(b)
+    tmp.replace(path)
+
+def atomic_write_json(path: Path, obj: Any) -> None:
+    _write_json(path, obj)
 
+def write_and_hash(path: Path, obj: Any) -> str:
+    """Atomically writes obj as JSON and returns sha1 of the written bytes (single serialization)."""
+    hasher = hashlib.sha1()
+    _write_json(path, obj, hasher)
+    return hasher.hexdigest()
+
+def _dumps_canonical(obj: Any) -> bytes:
+    # stdlib with default separators on purpose: these are the bytes meta.sha1 has always
+    # covered, and orjson cannot emit ", " / ": ", so it would change every digest
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True).encode("utf-8")
+
+def sha1_of_obj(obj: Any) -> str:
+    return hashlib.sha1(_dumps_canonical(obj)).hexdigest()
 
-def load_people(conn: psycopg.Connection) -> List[Dict[str, Any]]:
+def write_catalog_with_sha1(path: Path, body: Dict[str, Any], meta: Dict[str, Any], hashed: Any) -> str:
     """
-    employee + active employment (valid_to IS NULL):
-    - email/phone/room/role we take from employment table, aggregate and deduplicate.
+    Writes {**body, "meta": {**meta, "sha1"}} in the usual indented layout and returns the sha1.
+    meta.sha1 is the sha1 of `hashed` in canonical form (_dumps_canonical), not of the file bytes;
+    main() passes the raw {"people", "units", "procedures"} sections, as it always has.
     """
+    sha = sha1_of_obj(hashed)
+    _write_json(path, {**body, "meta": {**meta, "sha1": sha}})
+    return sha
 
-    emp_rows = conn.execute("""
-        SELECT employee_id, full_name, first_name, last_name, degree, email, phone, room
-        FROM employee
-        ORDER BY last_name, first_name
-    """).fetchall()
 
+def load_name_memo(path: Path) -> Dict[int, Tuple[str, List[str]]]:
+    """person_id -> (full_name, name_folded) from a previous people.json snapshot (empty if missing/broken)."""
+    try:
+        raw = path.read_bytes()
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        return {p["person_id"]: (p["full_name"], p["name_folded"]) for p in data["people"]}
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
 
-    job_rows = conn.execute("""
-        SELECT employee_id, unit_id, role, room, work_email, work_phone
-        FROM employment
-        WHERE valid_to IS NULL
-        ORDER BY employee_id
-    """).fetchall()
+
+def load_people(
+    conn: psycopg.Connection,
+    name_memo: Optional[Dict[int, Tuple[str, List[str]]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    employee + active employment (valid_to IS NULL):
+    - email/phone/room/role we take from employment table, aggregate and deduplicate.
+    - name_folded is reused from name_memo when the display name did not change.
+    """
 
     by_emp: Dict[int, Dict[str, Any]] = {}
-    for r in emp_rows:
-        pid = int(r["employee_id"])
-        full = (r["full_name"] or "").strip() or f"{(r['first_name'] or '').strip()} {(r['last_name'] or '').strip()}".strip()
-        by_emp[pid] = {
-            "person_id": pid,
-            "full_name": full,
-            "first_name": (r["first_name"] or "").strip(),
-            "last_name": (r["last_name"] or "").strip(),
-            "degree": r.get("degree"),
-            "emails": [],
-            "phones_nsn9": [],
-            "room": r.get("room"),
-            "role": None,
-            "name_folded": [],
-        }
-
-
-    for j in job_rows:
-        pid = int(j["employee_id"])
-        if pid not in by_emp:
+    with conn.cursor(name="emp_cur", row_factory=tuple_row) as cur:
+        cur.itersize = _FETCH_ITERSIZE
+        cur.execute("""
+            SELECT employee_id, full_name, first_name, last_name, degree, email, phone, room
+            FROM employee
+            ORDER BY last_name, first_name
+        """)
+        for pid, full_name, first_name, last_name, degree, _email, _phone, room in cur:
+            full_name, first_name, last_name = person_names(full_name, first_name, last_name)
             by_emp[pid] = {
-                "person_id": pid, "full_name": "", "first_name": "", "last_name": "", "degree": None,
-                "emails": [], "phones_nsn9": [], "room": None, "role": None, "name_folded": []
+                "person_id": pid,
+                "full_name": full_name,
+                "first_name": first_name,
+                "last_name": last_name,
+                "degree": degree,
+                "emails": [],
+                "phones_nsn9": [],
+                "room": room,
+                "role": None,
+                "name_folded": [],
             }
-        p = by_emp[pid]
-        if j.get("room"):
-            p["room"] = j["room"]
-        if j.get("role"):
-            p["role"] = j["role"]
 
 
-        for em in split_multi(j.get("work_email")):
-            eml = em.strip().lower()
-            if eml and eml not in p["emails"]:
-                p["emails"].append(eml)
-        ph = j.get("work_phone")
-        for phx in split_multi(ph):
-            nsn = phone_to_nsn9(phx)
-            if nsn and nsn not in p["phones_nsn9"]:
-                p["phones_nsn9"].append(nsn)
+    # per-person set mirrors of emails/phones: O(1) dedup, lists keep first-seen order
+    seen_emails: Dict[int, Set[str]] = {}
+    seen_phones: Dict[int, Set[str]] = {}
+    with conn.cursor(name="job_cur", row_factory=tuple_row) as cur:
+        cur.itersize = _FETCH_ITERSIZE
+        cur.execute("""
+            SELECT employee_id, unit_id, role, room, work_email, work_phone
+            FROM employment
+            WHERE valid_to IS NULL
+            ORDER BY employee_id
+        """)
+        for pid, _unit_id, role, room, work_email, work_phone in cur:
+            if pid not in by_emp:
+                by_emp[pid] = {
+                    "person_id": pid, "full_name": "", "first_name": "", "last_name": "", "degree": None,
+                    "emails": [], "phones_nsn9": [], "room": None, "role": None, "name_folded": []
+                }
+            p = by_emp[pid]
+            if room:
+                p["room"] = room
+            if role:
+                p["role"] = role
+
+
+            emails_seen = seen_emails.setdefault(pid, set())
+            for em in split_multi(work_email):
+                eml = em.strip().lower()
+                if eml and eml not in emails_seen:
+                    emails_seen.add(eml)
+                    p["emails"].append(eml)
+            phones_seen = seen_phones.setdefault(pid, set())
+            for phx in split_multi(work_phone):
+                nsn = phone_to_nsn9(phx)
+                if nsn and nsn not in phones_seen:
+                    phones_seen.add(nsn)
+                    p["phones_nsn9"].append(nsn)
 
 
     for p in by_emp.values():
-        display = p["full_name"] or f"{p['first_name']} {p['last_name']}".strip()
+        first, last = p["first_name"], p["last_name"]
+        display = p["full_name"] or f"{first} {last}".strip()
+        memo_hit = name_memo.get(p["person_id"]) if name_memo else None
+        if memo_hit is not None and memo_hit[0] == display:
+            p["name_folded"] = [sys.intern(x) for x in memo_hit[1]]
+            continue
+        if first and last and " " not in first and display == f"{first} {last}":
+            # display is exactly "first last" with a single-word first name:
+            # fold the parts once, no split/rejoin
+            ff, lf = fold_text(first), fold_text(last)
+            p["name_folded"] = sorted({sys.intern(f"{ff} {lf}"), sys.intern(f"{lf} {ff}")})
+            continue
         folded = set()
         if display:
             a = fold_text(display)
@@ -159,7 +264,7 @@ def load_people(conn: psycopg.Connection) -> List[Dict[str, Any]]:
                 imie = parts[0]
                 nazw = " ".join(parts[1:])
                 folded.add(f"{nazw} {imie}")
-        p["name_folded"] = sorted(folded)
+        p["name_folded"] = sorted(sys.intern(x) for x in folded)
 
 
     return sorted(by_emp.values(), key=lambda x: (x["last_name"], x["first_name"], x["person_id"]))
@@ -172,11 +277,12 @@ def load_units(conn: psycopg.Connection) -> List[Dict[str, Any]]:
     """).fetchall()
     out: List[Dict[str, Any]] = []
     for r in rows:
+        nm = strip_or_empty(r["name"])
         out.append({
-            "unit_id": int(r["unit_id"]),
-            "name": (r["name"] or "").strip(),
-            "parent_id": int(r["parent_id"]) if r["parent_id"] is not None else None,
-            "label_folded": fold_text(r["name"] or ""),
+            "unit_id": r["unit_id"],
+            "name": nm,
+            "parent_id": r["parent_id"],
+            "label_folded": sys.intern(fold_text(nm)),
         })
     return out
 
@@ -188,11 +294,11 @@ def load_procedures(conn: psycopg.Connection) -> List[Dict[str, Any]]:
     """).fetchall()
     out: List[Dict[str, Any]] = []
     for r in rows:
-        nm = (r["name"] or "").strip()
+        nm = strip_or_empty(r["name"])
         out.append({
-            "proc_id": int(r["proc_id"]),
+            "proc_id": r["proc_id"],
             "name": nm,
-            "alias_folded": [fold_text(nm)] if nm else [],
+            "alias_folded": [sys.intern(fold_text(nm))] if nm else [],
         })
     return out
 
@@ -203,12 +309,9 @@ def build_people_catalog(people: List[Dict[str, Any]]) -> Dict[str, Dict[str, in
     by_name:  Dict[str, int] = {}
     for p in people:
         pid = p["person_id"]
-        for em in p["emails"]:
-            by_email[em] = pid
-        for ph in p["phones_nsn9"]:
-            by_phone[ph] = pid
-        for nf in p["name_folded"]:
-            by_name[nf] = pid
+        by_email.update(dict.fromkeys(p["emails"], pid))
+        by_phone.update(dict.fromkeys(p["phones_nsn9"], pid))
+        by_name.update(dict.fromkeys(p["name_folded"], pid))
     return {"by_email": by_email, "by_phone": by_phone, "by_name": by_name}
 
 def build_units_catalog(units: List[Dict[str, Any]]) -> Dict[str, int]:
@@ -223,13 +326,23 @@ def build_procedures_catalog(procs: List[Dict[str, Any]]) -> Dict[str, int]:
     return by_alias
 
 
+def _run_with_conn(loader: Callable[..., Any], *args: Any) -> Any:
+    with connect_db() as conn:
+        return loader(conn, *args)
+
+
 def main() -> None:
     print("Connecting with Neon")
-    with connect_db() as conn:
-        print("Downloading people/units/procedures")
-        people = load_people(conn)
-        units  = load_units(conn)
-        procs  = load_procedures(conn)
+    name_memo = load_name_memo(PEOPLE_JSON)
+    print("Downloading people/units/procedures")
+    # independent queries: one connection each so the round-trips overlap
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        f_people = ex.submit(_run_with_conn, load_people, name_memo)
+        f_units  = ex.submit(_run_with_conn, load_units)
+        f_procs  = ex.submit(_run_with_conn, load_procedures)
+        people = f_people.result()
+        units  = f_units.result()
+        procs  = f_procs.result()
 
     meta = {
         "version": now_iso(),
@@ -237,9 +350,9 @@ def main() -> None:
     }
 
 
-    atomic_write_json(PEOPLE_JSON,     {"meta": meta, "people": people})
-    atomic_write_json(UNITS_JSON,      {"meta": meta, "units": units})
-    atomic_write_json(PROCEDURES_JSON, {"meta": meta, "procedures": procs})
+    people_sha = write_and_hash(PEOPLE_JSON,     {"meta": meta, "people": people})
+    units_sha  = write_and_hash(UNITS_JSON,      {"meta": meta, "units": units})
+    procs_sha  = write_and_hash(PROCEDURES_JSON, {"meta": meta, "procedures": procs})
 
 
     people_cat = build_people_catalog(people)
@@ -249,17 +362,16 @@ def main() -> None:
         "people": people_cat,
         "units": {"by_label": units_cat},
         "procedures": {"by_alias": procs_cat},
-        "meta": {
-            **meta,
-            "sha1": sha1_of_obj({"people": people_cat, "units": units_cat, "procedures": procs_cat})
-        }
     }
-    atomic_write_json(CATALOG_JSON, anchor_catalog)
+    write_catalog_with_sha1(
+        CATALOG_JSON, anchor_catalog, meta,
+        hashed={"people": people_cat, "units": units_cat, "procedures": procs_cat},
+    )
 
     print("Ready")
-    print(f"   -> {PEOPLE_JSON}")
-    print(f"   -> {UNITS_JSON}")
-    print(f"   -> {PROCEDURES_JSON}")
+    print(f"   -> {PEOPLE_JSON} (sha1 {people_sha})")
+    print(f"   -> {UNITS_JSON} (sha1 {units_sha})")
+    print(f"   -> {PROCEDURES_JSON} (sha1 {procs_sha})")
     print(f"   -> {CATALOG_JSON}")
 
 if __name__ == "__main__":
@@ -0,0 +1,160 @@
+"""
+Word-bounded multi-literal matching for the big name/alias alternations.
+
+Keys are already folded (casefold + ASCII-fold). Every backend returns the same
+spans the historical regex `(?<!\\w)(k1|k2|...)(?!\\w)` with keys sorted longest
+first would: at each position the longest bounded key wins, matches do not overlap.
+
+Backends:
+- Hyperscan (optional): all keys compiled into one DFA/NFA database, a single
+  linear scan per text regardless of key count.
+- regex module: fallback alternation compiled from a character trie (shared prefixes are
+  matched once instead of per alternative), gated by an Aho-Corasick automaton (optional
+  pyahocorasick) so texts containing no key at all never reach the backtracking regex.
+"""
+from typing import List, Tuple, Union
+import regex as re
+
+try:
+    import hyperscan
+except Exception:
+    hyperscan = None
+
+try:
+    import ahocorasick
+except Exception:
+    ahocorasick = None
+
+
+Span = Tuple[int, int]
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _trie_pattern(keys: List[str]) -> str:
+    """
+    Regex equivalent of `k1|k2|...` sorted longest first, built over a character trie:
+    the continuation of a node is tried greedily before its own end, so at a position the
+    longest key (that the caller's lookahead accepts) still wins.
+    """
+    trie: dict = {}
+    for k in keys:
+        node = trie
+        for ch in k:
+            node = node.setdefault(ch, {})
+        node[""] = None
+    return _trie_node_pattern(trie)
+
+def _trie_node_pattern(node: dict) -> str:
+    alts: List[str] = []
+    leaves: List[str] = []
+    for ch in sorted(k for k in node if k):
+        child = node[ch]
+        if len(child) == 1 and "" in child:
+            leaves.append(re.escape(ch))
+        else:
+            alts.append(re.escape(ch) + _trie_node_pattern(child))
+    if leaves:
+        alts.append(leaves[0] if len(leaves) == 1 else "[" + "".join(leaves) + "]")
+    if not alts:
+        return ""
+    if "" in node:
+        return "(?:" + "|".join(alts) + ")?"
+    if len(alts) == 1:
+        return alts[0]
+    return "(?:" + "|".join(alts) + ")"
+
+
+class RegexAlternation:
+    """Backtracking alternation, longest keys first (as a trie regex)."""
+
+    def __init__(self, keys: List[str]):
+        uniq = sorted(set(keys), key=len, reverse=True)
+        self.ac = None
+        if not uniq:
+            self.rx = re.compile(r"(?!x)x")
+        else:
+            alt = _trie_pattern(uniq)
+            self.rx = re.compile(rf"(?<!\w)({alt})(?!\w)")
+            if ahocorasick is not None and all(uniq):
+                # unbounded substring hits: a superset of the regex matches, linear in len(text)
+                self.ac = ahocorasick.Automaton()
+                for k in uniq:
+                    self.ac.add_word(k, k)
+                self.ac.make_automaton()
+
+    def spans(self, text: str) -> List[Span]:
+        if self.ac is not None and next(self.ac.iter(text), None) is None:
+            return []
+        return [(m.start(1), m.end(1)) for m in self.rx.finditer(text)]
+
+
+class HyperscanAlternation:
+    """
+    One Hyperscan database over all keys. Hyperscan has no lookarounds and reports
+    every (overlapping) hit, so word boundaries and leftmost-longest selection are
+    applied on the reported spans.
+    """
+
+    def __init__(self, keys: List[str]):
+        uniq = sorted(set(k for k in keys if k))
+        self.db = hyperscan.Database()
+        self.db.compile(
+            expressions=[re.escape(k).encode("utf-8") for k in uniq],
+            ids=list(range(len(uniq))),
+            elements=len(uniq),
+            flags=[hyperscan.HS_FLAG_SOM_LEFTMOST | hyperscan.HS_FLAG_UTF8] * len(uniq),
+        )
+
+    def spans(self, text: str) -> List[Span]:
+        if not text:
+            return []
+        data = text.encode("utf-8")
+        hits: List[Span] = []
+
+        def on_match(_id, start, end, _flags, _ctx):
+            hits.append((start, end))
+            return None
+
+        self.db.scan(data, match_event_handler=on_match)
+        if not hits:
+            return []
+
+        if len(data) != len(text):
+            b2c = [0] * (len(data) + 1)
+            bpos = 0
+            for cpos, ch in enumerate(text):
+                n = len(ch.encode("utf-8"))
+                for k in range(n):
+                    b2c[bpos + k] = cpos
+                bpos += n
+            b2c[bpos] = len(text)
+            hits = [(b2c[s], b2c[e]) for s, e in hits]
+
+        out: List[Span] = []
+        last_end = 0
+        for s, e in sorted(set(hits), key=lambda se: (se[0], -se[1])):
+            if s < last_end:
+                continue
+            if s > 0 and _is_word_char(text[s - 1]):
+                continue
+            if e < len(text) and _is_word_char(text[e]):
+                continue
+            out.append((s, e))
+            last_end = e
+        return out
+
+
+Alternation = Union[RegexAlternation, HyperscanAlternation]
+
+
+def build_alternation(keys: List[str]) -> Alternation:
+    """Hyperscan when installed and the keys compile, otherwise the regex fallback."""
+    if hyperscan is not None and any(keys):
+        try:
+            return HyperscanAlternation(keys)
+        except Exception:
+            pass
+    return RegexAlternation(keys)
@@ -0,0 +1,79 @@
+"""
+Casefold + ASCII-fold (NFKD without combining marks) with a map back to the source indices.
+Kept free of catalog/config imports so the pipeline and tests can use it standalone.
+"""
+import functools
+import unicodedata
+from typing import List, Tuple
+
+from knowledge.helpers import helpers
+
+
+@functools.lru_cache(maxsize=None)
+def _nfkd_base_chars(ch: str) -> str:
+    """NFKD of a single char without combining marks; memoized per codepoint (small alphabet)."""
+    return "".join(d for d in unicodedata.normalize("NFKD", ch) if not unicodedata.combining(d))
+
+class _FoldTable(dict):
+    """
+    codepoint -> _nfkd_base_chars, filled on first sight. str.translate looks it up in C,
+    so the whole fold runs as one translate call once the page alphabet is known.
+    irregular: codepoints folding to != 1 char ("…", "ﬁ", lone combining marks), the only
+    ones that break the identity index map.
+    """
+    def __init__(self):
+        super().__init__()
+        self.irregular = set()
+
+    def __missing__(self, cp: int) -> str:
+        base = _nfkd_base_chars(chr(cp))
+        if len(base) != 1:
+            self.irregular.add(cp)
+        self[cp] = base
+        return base
+
+_FOLD_TABLE = _FoldTable()
+
+def _ascii_fold(s: str) -> str:
+    """lower + removes "ńćśążź", (NFKD) → ASCII-latin"""
+    s = (s or "").strip().casefold()
+    if s.isascii():
+        return s
+    folded = helpers.fold_polish(s)
+    if folded is not None:
+        return folded
+    # per-codepoint NFKD equals whole-string NFKD once combining marks are dropped
+    return s.translate(_FOLD_TABLE)
+
+def _ascii_fold_with_map(s: str) -> Tuple[str, List[int]]:
+    """
+    return (norm text, mapa_normidx→origidx).
+    Every normalised char points which index it originates from.
+    """
+    src = s or ""
+    src_cf = src.casefold()
+    if src_cf.isascii():
+        # ASCII: NFKD is identity and casefold keeps length, so the map is the identity
+        return src_cf, list(range(len(src_cf)))
+    folded = helpers.fold_polish(src_cf)
+    if folded is not None:
+        # translate is 1:1, so the map stays the identity
+        return folded, list(range(len(src_cf)))
+    norm = src_cf.translate(_FOLD_TABLE)
+    irregular = _FOLD_TABLE.irregular
+    if not irregular or irregular.isdisjoint(map(ord, src_cf)):
+        # every char folded to exactly one char
+        return norm, list(range(len(src_cf)))
+    norm2orig: List[int] = []
+    for i, ch in enumerate(src_cf):
+        if ord(ch) in irregular:
+            norm2orig.extend([i] * len(_FOLD_TABLE[ord(ch)]))
+        else:
+            norm2orig.append(i)
+    return norm, norm2orig
+
+@functools.lru_cache(maxsize=4096)
+def _ascii_fold_with_map_cached(s: str) -> Tuple[str, Tuple[int, ...]]:
+    """Memoized _ascii_fold_with_map; map is a tuple so cached values stay immutable."""
+    norm, n2o = _ascii_fold_with_map(s)
+    return norm, tuple(n2o)
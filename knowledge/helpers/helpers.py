@@ -1,5 +1,26 @@
 import re, urllib.parse
-from typing import Optional
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+_T = TypeVar("_T")
+
+_EXT_SPLIT_RE = re.compile(r'(?i)(?:\bwew\.?\b|\bw\.?\b|\bext\.?\b|\bextension\b|\bx\b|;|#)')
+_DIGITS_RE = re.compile(r'\d+')
+_HYPHEN_RE = re.compile(r"\s*[\-\u2010\u2011\u2012\u2013\u2014\u2212]\s*")
+_NBSP_TABLE = {0xa0: 0x20}
+# casefolded polish diacritics -> base letter, same result as NFKD minus combining marks;
+# 'ł' has no decomposition, so it is kept as is (like NFKD does)
+_PL_FOLD_TABLE = str.maketrans("ąćęńóśźż", "acenoszz")
+_NOT_PL_FOLDED_RE = re.compile(r"[^\x00-\x7fł]")
+
+def fold_polish(s_cf: str) -> Optional[str]:
+    """
+    Fast ASCII-fold of an already casefolded string via str.translate (1:1, keeps indices).
+    return None if other non-ASCII chars remain and the caller must fall back to NFKD.
+    """
+    out = s_cf.translate(_PL_FOLD_TABLE)
+    if out.isascii() or not _NOT_PL_FOLDED_RE.search(out):
+        return out
+    return None
 
 def normalise_phone(raw: str | None) -> Optional[str]:
     """
@@ -16,13 +37,13 @@ def normalise_phone(raw: str | None) -> Optional[str]:
     if not raw:
         return None
 
-    s = str(raw).replace("\xa0", " ").strip()
+    s = str(raw).translate(_NBSP_TABLE).strip()
 
 
-    s = re.split(r'(?i)(?:\bwew\.?\b|\bw\.?\b|\bext\.?\b|\bextension\b|\bx\b|;|#)', s, maxsplit=1)[0]
+    s = _EXT_SPLIT_RE.split(s, maxsplit=1)[0]
 
 
-    digits = re.findall(r'\d+', s)
+    digits = _DIGITS_RE.findall(s)
     if not digits:
         return None
     nums = ''.join(digits)
@@ -43,9 +64,34 @@ def normalise_phone(raw: str | None) -> Optional[str]:
     return nsn9
 
 def normalize_email(s: str) -> str:
-    s = (s or "").strip().lower()
-    s = urllib.parse.unquote(s)
-    return s
+    s = (s or "").strip()
+    if "%" in s:
+        s = urllib.parse.unquote(s)
+    # lowercased after unquoting, so collected emails are final lookup keys
+    return s.lower()
 
 def norm_hyphens(s: str) -> str:
-    return re.sub(r"\s*[\-\u2010\u2011\u2012\u2013\u2014\u2212]\s*", "-", s)
+    return _HYPHEN_RE.sub("-", s)
+
+
+class LastObjectCache(Generic[_T]):
+    """
+    build(obj) for the last object seen, matched by identity (`is`). The object is held,
+    so it cannot be freed and have its id() reused while cached. Objects are treated as
+    read-only once seen: a rebuilt object gets a fresh value, in-place edits need clear().
+    """
+    __slots__ = ("_build", "_obj", "_value", "_full")
+
+    def __init__(self, build: Callable[[Any], _T]):
+        self._build = build
+        self.clear()
+
+    def get(self, obj: Any) -> _T:
+        if not self._full or self._obj is not obj:
+            value = self._build(obj)
+            self._obj, self._value, self._full = obj, value, True
+        return self._value
+
+    def clear(self) -> None:
+        self._obj = self._value = None
+        self._full = False
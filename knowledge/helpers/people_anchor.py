@@ -1,12 +1,14 @@
 from knowledge.helpers.config import Anchor
-import hashlib
+import functools
 import regex as re
-import unicodedata
 from knowledge.helpers import helpers
+from knowledge.helpers.alternation import Alternation, build_alternation
+from knowledge.helpers.ascii_fold import _ascii_fold, _ascii_fold_with_map, _ascii_fold_with_map_cached
 from typing import Optional, Tuple, List, Dict
 from bs4 import BeautifulSoup, Tag, NavigableString
 from input.neon_database.load_catalog import load_catalog, build_people_index
 import urllib.parse
+import zlib
 from knowledge.helpers.config import (
     MAILTO_IN_HREF_RX,
     EMAIL_PG_RX,
@@ -18,15 +20,19 @@ from knowledge.helpers.config import (
     COLOR_FALLBACK_REGION,
 )
 
+# one scan per text node for both kinds; the matched group tells which collector it belongs to
+EMAIL_OR_PHONE_RX = re.compile(
+    f"(?P<email>{EMAIL_PG_RX.pattern})|(?P<phone>{PHONE_RX.pattern})",
+    EMAIL_PG_RX.flags | PHONE_RX.flags,
+)
+
 
 def _scheme_index_for_id(per_id: Optional[str | int]) -> Optional[int]:
     """Maps per_id into colours"""
     if per_id is None:
         return None
-    key = str(per_id).encode("utf-8")
-    digest = hashlib.blake2s(key, digest_size=4).digest()
-    num = int.from_bytes(digest, "big")
-    return num % len(COLOR_SCHEMES)
+    # crc32: stable across runs (unlike hash() under PYTHONHASHSEED), no hashlib object per call
+    return zlib.crc32(str(per_id).encode("utf-8")) % len(COLOR_SCHEMES)
 
 def _apply_colors_to_anchors(anchors: List[Anchor]) -> None:
     """
@@ -53,11 +59,26 @@ def _is_inside_href(node: Tag | NavigableString, rx) -> bool:
         cur = cur.parent
     return False
 
-def _is_inside_mailto(node: Tag | NavigableString) -> bool:
-    return _is_inside_href(node, MAILTO_IN_HREF_RX)
+InsideCache = Dict[Tuple[int, str], Tuple[Tag, bool]]
+
+def _is_inside_href_cached(node: Tag | NavigableString, rx, label: str, cache: Optional[InsideCache]) -> bool:
+    """_is_inside_href memoized per (parent, label) for one document; the stored parent pins its id()."""
+    if cache is None:
+        return _is_inside_href(node, rx)
+    parent = node if isinstance(node, Tag) else node.parent
+    key = (id(parent), label)
+    hit = cache.get(key)
+    if hit is not None and hit[0] is parent:
+        return hit[1]
+    res = _is_inside_href(node, rx)
+    cache[key] = (parent, res)
+    return res
 
-def _is_inside_tel(node: Tag | NavigableString) -> bool:
-    return _is_inside_href(node, TEL_IN_HREF_RX)
+def _is_inside_mailto(node: Tag | NavigableString, cache: Optional[InsideCache] = None) -> bool:
+    return _is_inside_href_cached(node, MAILTO_IN_HREF_RX, "mailto", cache)
+
+def _is_inside_tel(node: Tag | NavigableString, cache: Optional[InsideCache] = None) -> bool:
+    return _is_inside_href_cached(node, TEL_IN_HREF_RX, "tel", cache)
 
 _LINE_CONTAINERS = {"p", "li", "dd", "dt"}
 
@@ -80,15 +101,19 @@ def _choose_wrap_node_for_person(soup: BeautifulSoup, span_node: Tag) -> Tag:
         return span_node.parent if isinstance(span_node.parent, Tag) else span_node
 
 
+    children = cont.contents
+    if not any(isinstance(ch, Tag) and ch.name == "br" for ch in children):
+        # no <br>: the whole container is the line, nothing to slice or wrap
+        return cont
+
     top = span_node
     while isinstance(top.parent, Tag) and top.parent is not cont:
         top = top.parent
 
 
-    children = list(cont.children)
-    try:
-        idx = children.index(top)
-    except ValueError:
+    # identity lookup: Tag.__eq__ compares markup, so .index() could hit a twin node
+    idx = next((i for i, ch in enumerate(children) if ch is top), None)
+    if idx is None:
         return span_node.parent if isinstance(span_node.parent, Tag) else span_node
 
 
@@ -110,7 +135,7 @@ def _choose_wrap_node_for_person(soup: BeautifulSoup, span_node: Tag) -> Tag:
             break
 
 
-    line_nodes = [children[k] for k in range(start_i, end_i + 1)]
+    line_nodes = children[start_i:end_i + 1]
     if not line_nodes:
         return span_node.parent if isinstance(span_node.parent, Tag) else span_node
 
@@ -123,62 +148,73 @@ def _choose_wrap_node_for_person(soup: BeautifulSoup, span_node: Tag) -> Tag:
 
     return wrapper
 
-def _iter_text_nodes(scope: Tag | BeautifulSoup):
-    for tn in scope.find_all(string=True):
-        if tn.parent and tn.parent.name in ("script", "style"):
-            continue
-        if tn and str(tn).strip():
-            yield tn
+_SKIP_TEXT_PARENTS = {"script", "style"}
 
-def _split_text_node_with_span(soup: BeautifulSoup, tn: NavigableString, start: int, end: int, kind: str) -> Tag:
-    raw = str(tn)
-    before, mid, after = raw[:start], raw[start:end], raw[end:]
-    span = soup.new_tag("span")
-    span.string = mid
-    span["data-annot"] = kind
-    parts: List[object] = []
-    if before: parts.append(NavigableString(before))
-    parts.append(span)
-    if after: parts.append(NavigableString(after))
-    parent = tn.parent
-    tn.replace_with(*parts)
-    return span
+def _collect_text_nodes_once(scope: Tag | BeautifulSoup) -> List[NavigableString]:
+    """
+    Non-blank text nodes of scope in document order, via one explicit DFS;
+    script/style subtrees are pruned instead of checking each node's parent.
+    Collectors split text nodes, so each pass has to re-collect after the previous one mutated the tree.
+    """
+    out: List[NavigableString] = []
+    stack: List[object] = [scope]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Tag):
+            if node.name in _SKIP_TEXT_PARENTS:
+                continue
+            stack.extend(reversed(node.contents))
+        elif isinstance(node, NavigableString) and node.strip():
+            out.append(node)
+    return out
 
-def _ascii_fold(s: str) -> str:
-    """lower + removes "ńćśążź", (NFKD) → ASCII-latin"""
-    s = (s or "").strip().casefold()
-    decomposed = unicodedata.normalize("NFKD", s)
-    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+def _iter_text_nodes(scope: Tag | BeautifulSoup):
+    return iter(_collect_text_nodes_once(scope))
 
-def _ascii_fold_with_map(s: str) -> Tuple[str, List[int]]:
+def _split_text_node_with_spans(
+    soup: BeautifulSoup,
+    tn: NavigableString,
+    spans: List[Tuple[int, int, str]],
+) -> List[Tag]:
     """
-    return (norm text, mapa_normidx→origidx).
-    Every normalised char points which index it originates from.
+    Cuts all (start, end, kind) spans out of one text node with a single replace_with.
+    spans must not overlap; return the <span data-annot=kind> tags in the order of spans.
+    (one call per node: after a replace_with tn is detached, so it cannot be split again)
     """
-    norm_chars: List[str] = []
-    norm2orig: List[int] = []
-    src = s or ""
-    src_cf = src.casefold()
-    for i, ch in enumerate(src_cf):
-        decomp = unicodedata.normalize("NFKD", ch)
-        for dch in decomp:
-            if not unicodedata.combining(dch):
-                norm_chars.append(dch)
-                norm2orig.append(i)
-    return "".join(norm_chars), norm2orig
+    raw = str(tn)
+    tags: List[Tag] = []
+    parts: List[object] = []
+    pos = 0
+    for start, end, kind in spans:
+        if start > pos:
+            parts.append(NavigableString(raw[pos:start]))
+        span = soup.new_tag("span")
+        span.string = raw[start:end]
+        span["data-annot"] = kind
+        parts.append(span)
+        tags.append(span)
+        pos = end
+    if pos < len(raw):
+        parts.append(NavigableString(raw[pos:]))
+    tn.replace_with(*parts)
+    return tags
 
 def _norm_fullname_key(s: str) -> str:
     return " ".join(_ascii_fold(s).split())
 
-def _build_name_regex_from_keys(keys: List[str]) -> re.Pattern:
+def _build_name_regex_from_keys(keys: List[str]) -> Alternation:
     """
     keys -> already lowercase, ascii-folded (like in fullname_to_id).
     """
-    if not keys:
-        return re.compile(r"(?!x)x")
-    uniq = sorted(set(keys), key=len, reverse=True)
-    alt = "|".join(re.escape(k) for k in uniq)
-    return re.compile(rf"(?<!\w)({alt})(?!\w)")
+    return build_alternation(keys)
+
+# compiled matcher of the last fullname_to_id seen
+_NAME_RX_CACHE: helpers.LastObjectCache[Alternation] = helpers.LastObjectCache(
+    lambda fullname_to_id: _build_name_regex_from_keys(list(fullname_to_id.keys()))
+)
+
+def _name_regex_for(fullname_to_id: Dict[str, str]) -> Alternation:
+    return _NAME_RX_CACHE.get(fullname_to_id)
 
 def _extract_tel_from_href(href: str) -> Optional[str]:
     """
@@ -202,21 +238,20 @@ def _collect_text_person_names(
     if not fullname_to_id:
         return out
 
-    rx = _build_name_regex_from_keys(list(fullname_to_id.keys()))
+    rx = _name_regex_for(fullname_to_id)
 
     for tn in _iter_text_nodes(soup):
         raw = str(tn)
         if not raw.strip():
             continue
 
-        norm, n2o = _ascii_fold_with_map(raw)
-        matches = list(rx.finditer(norm))
+        norm, n2o = _ascii_fold_with_map_cached(raw)
+        matches = rx.spans(norm)
         if not matches:
             continue
 
-        for m in reversed(matches):
-            n_start = m.start(1)
-            n_end = m.end(1)
+        found: List[Tuple[int, int, str, str]] = []
+        for n_start, n_end in matches:
 
             o_start = n2o[n_start]
             o_end = n2o[n_end - 1] + 1
@@ -229,15 +264,16 @@ def _collect_text_person_names(
             if not person_id:
                 continue
 
+            found.append((o_start, o_end, person_id, folded_name))
 
-            span = _split_text_node_with_span(
-                soup=soup,
-                tn=tn,
-                start=o_start,
-                end=o_end,
-                kind="person_name",
-            )
+        if not found:
+            continue
+
+        spans = _split_text_node_with_spans(
+            soup, tn, [(o_start, o_end, "person_name") for o_start, o_end, _, _ in found]
+        )
 
+        for span, (_, _, person_id, folded_name) in zip(spans, found):
 
             wrap_node = _choose_wrap_node_for_person(soup, span)
 
@@ -278,28 +314,6 @@ def _collect_mailto_emails(soup: BeautifulSoup) -> List[Anchor]:
         ))
     return out
 
-def _collect_text_emails(soup: BeautifulSoup) -> List[Anchor]:
-    out: List[Anchor] = []
-    for tn in _iter_text_nodes(soup):
-        if _is_inside_mailto(tn):
-            continue
-        raw = str(tn)
-        for m in EMAIL_PG_RX.finditer(raw):
-            val = helpers.normalize_email(m.group(0))
-            span = _split_text_node_with_span(soup, tn, m.start(0), m.end(0), kind="email")
-            out.append(Anchor(
-                name=None,
-                kind="email",
-                per_id=None,
-                node=span,
-                trigger_node=span,
-                value=val,
-                source="det:text",
-                score=1.0,
-            ))
-    return out
-
-
 def _collect_telhref_phones(soup: BeautifulSoup) -> List[Anchor]:
     out: List[Anchor] = []
     for a in soup.find_all("a"):
@@ -321,28 +335,60 @@ def _collect_telhref_phones(soup: BeautifulSoup) -> List[Anchor]:
             ))
     return out
 
-def _collect_text_phones(soup: BeautifulSoup) -> List[Anchor]:
-    out: List[Anchor] = []
+def _collect_text_emails_and_phones(
+    soup: BeautifulSoup,
+    inside_cache: Optional[InsideCache] = None,
+) -> Tuple[List[Anchor], List[Anchor]]:
+    """
+    Text emails and text phones in a single pass over the text nodes.
+    return (emails, phones); emails inside mailto: and phones inside tel: links are skipped.
+    """
+    emails: List[Anchor] = []
+    phones: List[Anchor] = []
     for tn in _iter_text_nodes(soup):
-        if _is_inside_tel(tn):
-            continue
         raw = str(tn)
-        for m in PHONE_RX.finditer(raw):
-            nsn9 = helpers.normalise_phone(m.group(0))
-            if not nsn9:
-                continue
-            span = _split_text_node_with_span(soup, tn, m.start(0), m.end(0), kind="phone")
+        # string scan first; the Python-level ancestor walks only for nodes that match
+        matches = list(EMAIL_OR_PHONE_RX.finditer(raw))
+        if not matches:
+            continue
+        in_mailto: Optional[bool] = None
+        in_tel: Optional[bool] = None
+        found: List[Tuple[int, int, str, str, List[Anchor]]] = []
+        for m in matches:
+            if m.group("email") is not None:
+                if in_mailto is None:
+                    in_mailto = _is_inside_mailto(tn, inside_cache)
+                if in_mailto:
+                    continue
+                val = helpers.normalize_email(m.group(0))
+                kind, out = "email", emails
+            else:
+                if in_tel is None:
+                    in_tel = _is_inside_tel(tn, inside_cache)
+                if in_tel:
+                    continue
+                val = helpers.normalise_phone(m.group(0))
+                if not val:
+                    continue
+                kind, out = "phone", phones
+            found.append((m.start(0), m.end(0), kind, val, out))
+
+        if not found:
+            continue
+
+        spans = _split_text_node_with_spans(soup, tn, [(start, end, kind) for start, end, kind, _, _ in found])
+        for span, (_, _, kind, val, out) in zip(spans, found):
             out.append(Anchor(
                 name=None,
-                kind="phone",
+                kind=kind,
                 per_id=None,
                 node=span,
                 trigger_node=span,
-                value=nsn9,
+                value=val,
                 source="det:text",
                 score=1.0,
             ))
-    return out
+    return emails, phones
 
 
 def _attach_to_people(
@@ -354,6 +400,13 @@ def _attach_to_people(
     fullname_to_id = (people_index or {}).get("fullname_to_id") or {}
     id_to_fullname = (people_index or {}).get("id_to_fullname") or {}
 
+    # emails are lowercased by normalize_email at collection, so every value is a ready key
+    index_by_kind = {
+        "email": email_to_id,
+        "phone": phone_to_id,
+        "person_name": fullname_to_id,
+    }
+
     linked_anchors: List[Anchor] = []
     dropped: List[Anchor] = []
 
@@ -361,12 +414,10 @@ def _attach_to_people(
         per_id: Optional[str] = getattr(a, "per_id", None)
         name: Optional[str] = getattr(a, "name", None)
 
-        if a.kind == "email" and a.value:
-            per_id = per_id or email_to_id.get(a.value.lower())
-        elif a.kind == "phone" and a.value:
-            per_id = per_id or phone_to_id.get(a.value)
-        elif a.kind == "person_name" and a.value:
-            per_id = per_id or fullname_to_id.get(a.value)
+        if not per_id and a.value:
+            index = index_by_kind.get(a.kind)
+            if index is not None:
+                per_id = index.get(a.value)
 
 
         if per_id and not name:
@@ -376,34 +427,44 @@ def _attach_to_people(
         a.name = name
 
         if a.per_id is None:
-            dropped.append(Anchor(
-                name=None,
-                kind=a.kind,
-                per_id=None,
-                node=a.node,
-                trigger_node=a.trigger_node,
-                value=a.value,
-                source=(a.source or "det") + "|unlinked",
-                score=a.score,
-            ))
+            a.name = None
+            a.source = (a.source or "det") + "|unlinked"
+            dropped.append(a)
         else:
             linked_anchors.append(a)
 
     return linked_anchors, dropped
 
 
-def find_people_anchors(soup: BeautifulSoup) -> Tuple[List[Anchor], List[Anchor]]:
-    cat = load_catalog()
-    people_index = build_people_index(cat)
+@functools.lru_cache(maxsize=1)
+def get_catalog():
+    """
+    load_catalog() once per process; call get_catalog.cache_clear() after the catalog was refreshed.
+    Derived indices below are cached per catalog object (`is`), so a reloaded catalog gets fresh ones.
+    """
+    return load_catalog()
+
+# people_index of the last catalog seen
+_PEOPLE_INDEX_CACHE: helpers.LastObjectCache[Dict[str, Dict[str, str]]] = helpers.LastObjectCache(build_people_index)
+
+def _people_index_for(cat) -> Dict[str, Dict[str, str]]:
+    return _PEOPLE_INDEX_CACHE.get(cat)
+
+def find_people_anchors(soup: BeautifulSoup, catalog=None) -> Tuple[List[Anchor], List[Anchor]]:
+    cat = catalog if catalog is not None else get_catalog()
+    # a stable people_index also keeps fullname_to_id identical, so _name_regex_for hits its cache
+    people_index = _people_index_for(cat)
 
     fullname_to_id = (people_index or {}).get("fullname_to_id") or {}
     all_candidates: List[Anchor] = []
+    inside_cache: InsideCache = {}
 
 
+    text_emails, text_phones = _collect_text_emails_and_phones(soup, inside_cache)
     all_candidates += _collect_mailto_emails(soup)
-    all_candidates += _collect_text_emails(soup)
+    all_candidates += text_emails
     all_candidates += _collect_telhref_phones(soup)
-    all_candidates += _collect_text_phones(soup)
+    all_candidates += text_phones
     all_candidates += _collect_text_person_names(soup, fullname_to_id)
 
     anchors, dropped = _attach_to_people(all_candidates, people_index)
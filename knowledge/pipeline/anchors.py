@@ -1,17 +1,33 @@
 from __future__ import annotations
 from typing import Dict, List, Tuple, Optional
-from bs4 import BeautifulSoup, Tag, NavigableString
-from input.neon_database.load_catalog import load_catalog
-from knowledge.helpers.people_anchor import find_people_anchors
+from bisect import bisect_left, bisect_right
+from bs4 import BeautifulSoup, Tag, NavigableString, CData
+from dataclasses import dataclass
+from knowledge.helpers.people_anchor import (
+    find_people_anchors,
+    get_catalog,
+    _ascii_fold_with_map_cached,
+    _collect_text_nodes_once,
+    _split_text_node_with_spans,
+)
 from knowledge.helpers.config import Anchor
+from knowledge.helpers import helpers
+from knowledge.helpers.alternation import Alternation, build_alternation
 import unicodedata
 import regex as re
 
 
 try:
-    from rapidfuzz import fuzz
+    from rapidfuzz import fuzz, process as fuzz_process
 except Exception:
     fuzz = None
+    fuzz_process = None
+
+try:
+    # process.cdist returns a numpy matrix; without numpy the per-text extractOne path is used
+    import numpy as np
+except Exception:
+    np = None
 
 
 
@@ -27,49 +43,24 @@ def _iter_blocks(scope: Tag | BeautifulSoup):
         if t.name in BLOCK_TAGS and t.get_text(strip=True):
             yield t
 
+# string types get_text() joins by default (comments, scripts etc. are skipped)
+_GET_TEXT_TYPES = (NavigableString, CData)
+
 def _iter_text_nodes(tag: Tag):
-    for tn in tag.find_all(string=True):
-        p = tn.parent
-        if not p or p.name in ("script","style"):
-            continue
-        s = str(tn)
-        if s.strip():
-            yield tn
+    return iter(_collect_text_nodes_once(tag))
 
 def _ascii_fold(s: str) -> str:
     s = (s or "").casefold()
+    if s.isascii():
+        return s
+    folded = helpers.fold_polish(s)
+    if folded is not None:
+        return folded
     decomp = unicodedata.normalize("NFKD", s)
     return "".join(ch for ch in decomp if not unicodedata.combining(ch))
 
-def _ascii_fold_with_map(s: str):
-    norm_chars, norm2orig = [], []
-    s_cf = (s or "").casefold()
-    for i, ch in enumerate(s_cf):
-        for dch in unicodedata.normalize("NFKD", ch):
-            if not unicodedata.combining(dch):
-                norm_chars.append(dch)
-                norm2orig.append(i)
-    return "".join(norm_chars), norm2orig
-
-def _build_alt_regex(keys: List[str]) -> re.Pattern:
-    if not keys:
-        return re.compile(r"(?!x)x")
-    uniq = sorted(set(keys), key=len, reverse=True)
-    alt = "|".join(re.escape(k) for k in uniq)
-    return re.compile(rf"(?<!\w)({alt})(?!\w)")
-
-def _split_text_node_with_span(soup: BeautifulSoup, tn: NavigableString, start: int, end: int, kind: str) -> Tag:
-    raw = str(tn)
-    before, mid, after = raw[:start], raw[start:end], raw[end:]
-    span = soup.new_tag("span")
-    span.string = mid
-    span["data-annot"] = kind
-    parts: List[object] = []
-    if before: parts.append(NavigableString(before))
-    parts.append(span)
-    if after: parts.append(NavigableString(after))
-    tn.replace_with(*parts)
-    return span
+def _build_alt_regex(keys: List[str]) -> Alternation:
+    return build_alternation(keys)
 
 def _norm_key(s: str) -> str:
     return " ".join(_ascii_fold(s).split())
@@ -98,33 +89,45 @@ def _det_in_tag_for_map(
     soup: BeautifulSoup,
     tag: Tag,
     fold_map: Dict[str, int],
+    rx: Alternation,
     kind: str,
     source_label: str,
     id_to_name: Optional[Dict[int, str]] = None,
-) -> List[Anchor]:
-    """DET: match alias by fold, cut exact span."""
+) -> Tuple[List[Anchor], Optional[str]]:
+    """
+    DET: match alias by fold (rx precompiled from fold_map keys), cut exact span.
+    return (anchors, block text): the text equals tag.get_text(" ", strip=True) as it was
+    before this call, collected on the same walk, so FUZZ does not walk the block again.
+    block text is None when nothing was walked (empty fold_map).
+    """
     out: List[Anchor] = []
     if not fold_map:
-        return out
-
-    rx = _build_alt_regex(list(fold_map.keys()))
+        return out, None
 
+    text_parts: List[str] = []
     for tn in _iter_text_nodes(tag):
         raw = str(tn)
-        norm, n2o = _ascii_fold_with_map(raw)
-        matches = list(rx.finditer(norm))
+        if type(tn) in _GET_TEXT_TYPES:
+            text_parts.append(raw.strip())
+        norm, n2o = _ascii_fold_with_map_cached(raw)
+        matches = rx.spans(norm)
         if not matches:
             continue
 
-        for m in reversed(matches):
-            ns, ne = m.start(1), m.end(1)
+        found: List[Tuple[int, int, int]] = []
+        for ns, ne in matches:
             os, oe = n2o[ns], n2o[ne - 1] + 1
             folded = " ".join(norm[ns:ne].split())
             the_id = fold_map.get(folded)
             if the_id is None:
                 continue
+            found.append((os, oe, the_id))
+
+        if not found:
+            continue
 
-            span = _split_text_node_with_span(soup, tn, os, oe, kind=kind)
+        spans = _split_text_node_with_spans(soup, tn, [(os, oe, kind) for os, oe, _ in found])
+        for span, (os, oe, the_id) in zip(spans, found):
             name = id_to_name.get(the_id) if id_to_name else None
 
             out.append(Anchor(
@@ -137,32 +140,141 @@ def _det_in_tag_for_map(
                 source=f"det:{source_label}",
                 score=None,
             ))
-    return out
+    return out, " ".join(text_parts)
 
 
-def _fuzz_in_tag_for_map(
-    tag: Tag,
-    fold_map: Dict[str, int],
+def _flatten_aliases(aliases_by_id: Dict[int, List[str]]) -> Tuple[List[str], List[int]]:
+    """(all_aliases, alias_owner) in aliases_by_id iteration order, for batch scoring."""
+    all_aliases: List[str] = []
+    alias_owner: List[int] = []
+    for the_id, aliases in aliases_by_id.items():
+        all_aliases.extend(aliases)
+        alias_owner.extend([the_id] * len(aliases))
+    return all_aliases, alias_owner
+
+
+def _alias_tokens(aliases_by_id: Dict[int, List[str]]) -> Dict[int, List[frozenset]]:
+    """Folded token set per alias, computed once per catalog instead of per (block, alias) pair."""
+    return {
+        the_id: [frozenset(_ascii_fold(a).split()) for a in aliases]
+        for the_id, aliases in aliases_by_id.items()
+    }
+
+
+_WORD_RUN_RX = re.compile(r"\w+")
+
+# (folded key -> alias indices, alias lengths ascending, alias indices in that order)
+AliasFilter = Tuple[Dict[str, List[int]], List[int], List[int]]
+
+def _prefilter_keys(s: str) -> set:
+    """Folded word runs of s, plus folded tokens without any word char (e.g. '&')."""
+    keys = set()
+    for tok in _ascii_fold(s).split():
+        runs = _WORD_RUN_RX.findall(tok)
+        if runs:
+            keys.update(runs)
+        else:
+            keys.add(tok)
+    return keys
+
+def _token_set_len(s: str) -> int:
+    """Length of the sorted unique tokens joined by spaces (what token_set_ratio compares)."""
+    toks = set(s.split())
+    return sum(map(len, toks)) + len(toks) - 1 if toks else 0
+
+def _alias_filter(all_aliases: List[str]) -> AliasFilter:
+    """
+    Candidate index over flat aliases, built once per catalog.
+    The pruning is exact for token_set_ratio: a score > 0 at the cutoff needs either a shared
+    token (-> shared folded key) or, with no shared token, a plain ratio of the token strings,
+    which is bounded by 2*min(len)/(sum len) -> only aliases of compatible length.
+    """
+    by_key: Dict[str, List[int]] = {}
+    for i, alias in enumerate(all_aliases):
+        for k in _prefilter_keys(alias):
+            by_key.setdefault(k, []).append(i)
+    by_len = sorted(range(len(all_aliases)), key=lambda i: _token_set_len(all_aliases[i]))
+    lens = [_token_set_len(all_aliases[i]) for i in by_len]
+    return by_key, lens, by_len
+
+def _alias_candidates(text: str, alias_filter: AliasFilter, fuzz_threshold: float) -> List[int]:
+    """Flat alias indices (ascending, so tie order is kept) that can reach fuzz_threshold."""
+    by_key, lens, by_len = alias_filter
+    if fuzz_threshold <= 0:
+        return list(range(len(lens)))
+    cand = set()
+    for k in _prefilter_keys(text):
+        hit = by_key.get(k)
+        if hit:
+            cand.update(hit)
+    n = _token_set_len(text)
+    if n:
+        c = min(fuzz_threshold, 1.0)
+        lo = bisect_left(lens, n * c / (2 - c) - 1e-9)
+        hi = bisect_right(lens, n * (2 - c) / c + 1e-9)
+        cand.update(by_len[lo:hi])
+    return sorted(cand)
+
+
+def _pick_best_alias(
+    text: str,
     aliases_by_id: Dict[int, List[str]],
-    require_acronym_ok: Optional[Dict[int, List[str]]] = None,
+    flat_aliases: Optional[Tuple[List[str], List[int]]] = None,
+    alias_tokens_by_id: Optional[Dict[int, List[frozenset]]] = None,
     fuzz_threshold: float = 0.85,
+    alias_filter: Optional[AliasFilter] = None,
 ) -> Optional[Tuple[int, str, float]]:
-    """
-    return best (id, alias_matched, score) for given tag tagu or None.
-    if require_acronym_ok does have content for given id,
-    then fuzzy accepts only if doesHaveCoverage(text, acronim) == True.
-    """
-    text = tag.get_text(" ", strip=True)
-    if not text:
-        return None
-
+    """Scoring only: best (id, alias, score) for text, first best wins on ties."""
     best = None
-    for the_id, aliases in aliases_by_id.items():
-        for alias in aliases:
-            sc = _best_token_ratio(text, alias)
-            if sc > (best[2] if best else 0.0):
-                best = (the_id, alias, sc)
+    cand: Optional[List[int]] = None
+    if alias_filter is not None and flat_aliases is not None:
+        cand = _alias_candidates(text, alias_filter, fuzz_threshold)
+        if not cand:
+            return None
+    if fuzz_process is not None and flat_aliases is not None:
+        all_aliases, alias_owner = flat_aliases
+        choices = all_aliases if cand is None else [all_aliases[i] for i in cand]
+        hit = fuzz_process.extractOne(
+            text, choices,
+            scorer=fuzz.token_set_ratio,
+            processor=None,
+            score_cutoff=fuzz_threshold * 100,
+        )
+        if hit:
+            alias, sc, idx = hit
+            if cand is not None:
+                idx = cand[idx]
+            best = (alias_owner[idx], alias, sc / 100.0)
+    elif fuzz is None and alias_tokens_by_id is not None:
+        tb = frozenset(_ascii_fold(text).split())
+        if not tb:
+            return None
+        cand_ids = None if cand is None else {flat_aliases[1][i] for i in cand}
+        for the_id, aliases in aliases_by_id.items():
+            if cand_ids is not None and the_id not in cand_ids:
+                continue
+            for alias, ta in zip(aliases, alias_tokens_by_id[the_id]):
+                if not ta:
+                    continue
+                sc = len(ta & tb) / len(ta | tb)
+                if sc > (best[2] if best else 0.0):
+                    best = (the_id, alias, sc)
+    else:
+        for the_id, aliases in aliases_by_id.items():
+            for alias in aliases:
+                sc = _best_token_ratio(text, alias)
+                if sc > (best[2] if best else 0.0):
+                    best = (the_id, alias, sc)
+    return best
 
+
+def _accept_best_alias(
+    text: str,
+    best: Optional[Tuple[int, str, float]],
+    require_acronym_ok: Optional[Dict[int, List[str]]] = None,
+    fuzz_threshold: float = 0.85,
+) -> Optional[Tuple[int, str, float]]:
+    """Threshold + acronym coverage check on a scored candidate."""
     if not best or best[2] < fuzz_threshold:
         return None
 
@@ -178,15 +290,105 @@ def _fuzz_in_tag_for_map(
     return best
 
 
-def find_units_and_procedures_anchors(soup: BeautifulSoup, catalog) -> List[Anchor]:
+def _fuzz_in_tag_for_map(
+    tag: Tag,
+    fold_map: Dict[str, int],
+    aliases_by_id: Dict[int, List[str]],
+    require_acronym_ok: Optional[Dict[int, List[str]]] = None,
+    fuzz_threshold: float = 0.85,
+    flat_aliases: Optional[Tuple[List[str], List[int]]] = None,
+    alias_tokens_by_id: Optional[Dict[int, List[frozenset]]] = None,
+    alias_filter: Optional[AliasFilter] = None,
+) -> Optional[Tuple[int, str, float]]:
     """
-    DET: aliasy/etykiety po foldzie; wrap tylko dokładny span.
-    FUZZ: if nothing found in DET tag – pick best alias > 0.85;
-          if procedure has acronym/s, fuzzy requires coverage (stub).
+    return best (id, alias_matched, score) for given tag tagu or None.
+    if require_acronym_ok does have content for given id,
+    then fuzzy accepts only if doesHaveCoverage(text, acronim) == True.
+    flat_aliases (from _flatten_aliases) lets rapidfuzz score all aliases in one native call;
+    alias_tokens_by_id (from _alias_tokens) pre-folded token sets for the Jaccard fallback;
+    alias_filter (from _alias_filter) skips aliases that cannot reach the threshold.
     """
-    anchors: List[Anchor] = []
+    text = tag.get_text(" ", strip=True)
+    if not text:
+        return None
 
+    best = _pick_best_alias(text, aliases_by_id, flat_aliases, alias_tokens_by_id, fuzz_threshold, alias_filter)
+    return _accept_best_alias(text, best, require_acronym_ok, fuzz_threshold)
 
+
+_FUZZ_BATCH_ROWS = 256
+
+def _fuzz_many_for_map(
+    texts: List[str],
+    aliases_by_id: Dict[int, List[str]],
+    require_acronym_ok: Optional[Dict[int, List[str]]] = None,
+    fuzz_threshold: float = 0.85,
+    flat_aliases: Optional[Tuple[List[str], List[int]]] = None,
+    alias_tokens_by_id: Optional[Dict[int, List[frozenset]]] = None,
+    alias_filter: Optional[AliasFilter] = None,
+) -> List[Optional[Tuple[int, str, float]]]:
+    """
+    _fuzz_in_tag_for_map for many block texts at once.
+    With rapidfuzz and numpy the whole batch goes through process.cdist(workers=-1): scoring
+    runs on all cores in native code, in row batches to bound the score matrix.
+    """
+    bests: List[Optional[Tuple[int, str, float]]] = [None] * len(texts)
+    todo = [i for i, t in enumerate(texts) if t]
+    if alias_filter is not None and flat_aliases is not None:
+        # rows without a single plausible alias never reach the scorer
+        todo = [i for i in todo if _alias_candidates(texts[i], alias_filter, fuzz_threshold)]
+    if (np is not None and fuzz_process is not None and flat_aliases is not None
+            and flat_aliases[0] and len(todo) > 1):
+        all_aliases, alias_owner = flat_aliases
+        cutoff = fuzz_threshold * 100
+        for b in range(0, len(todo), _FUZZ_BATCH_ROWS):
+            rows = todo[b:b + _FUZZ_BATCH_ROWS]
+            scores = fuzz_process.cdist(
+                [texts[i] for i in rows], all_aliases,
+                scorer=fuzz.token_set_ratio,
+                processor=None,
+                score_cutoff=cutoff,
+                dtype=np.float64,
+                workers=-1,
+            )
+            for i, row in zip(rows, scores):
+                # float64 + argmax (first maximum) ties like the extractOne path
+                j = int(row.argmax())
+                sc = float(row[j])
+                if sc and sc >= cutoff:
+                    bests[i] = (alias_owner[j], all_aliases[j], sc / 100.0)
+    else:
+        for i in todo:
+            bests[i] = _pick_best_alias(
+                texts[i], aliases_by_id, flat_aliases, alias_tokens_by_id, fuzz_threshold, alias_filter
+            )
+    return [
+        _accept_best_alias(t, best, require_acronym_ok, fuzz_threshold) if t else None
+        for t, best in zip(texts, bests)
+    ]
+
+
+@dataclass(frozen=True)
+class _UnitProcIndex:
+    """Everything find_units_and_procedures_anchors derives from a catalog, built once per catalog."""
+    units_fold: Dict[str, int]
+    procs_fold: Dict[str, int]
+    proc_id_to_name: Dict[int, str]
+    unit_id_to_name: Dict[int, str]
+    procs_acronyms: Dict[int, List[str]]
+    aliases_per_unit: Dict[int, List[str]]
+    aliases_per_proc: Dict[int, List[str]]
+    units_rx: Alternation
+    procs_rx: Alternation
+    flat_units: Tuple[List[str], List[int]]
+    flat_procs: Tuple[List[str], List[int]]
+    unit_tokens: Optional[Dict[int, List[frozenset]]]
+    proc_tokens: Optional[Dict[int, List[frozenset]]]
+    unit_filter: AliasFilter
+    proc_filter: AliasFilter
+
+
+def _build_unit_proc_index(catalog) -> _UnitProcIndex:
     units_by_label: Dict[str, int] = getattr(catalog, "units_by_label", {}) or {}
     procs_by_alias: Dict[str, int] = getattr(catalog, "procs_by_alias", {}) or {}
 
@@ -209,32 +411,102 @@ def find_units_and_procedures_anchors(soup: BeautifulSoup, catalog) -> List[Anch
     for k, pid in procs_fold.items():
         aliases_per_proc.setdefault(pid, []).append(k)
 
+    flat_units = _flatten_aliases(aliases_per_unit)
+    flat_procs = _flatten_aliases(aliases_per_proc)
+
+    return _UnitProcIndex(
+        units_fold=units_fold,
+        procs_fold=procs_fold,
+        proc_id_to_name=proc_id_to_name,
+        unit_id_to_name=unit_id_to_name,
+        procs_acronyms=procs_acronyms,
+        aliases_per_unit=aliases_per_unit,
+        aliases_per_proc=aliases_per_proc,
+        units_rx=_build_alt_regex(list(units_fold.keys())),
+        procs_rx=_build_alt_regex(list(procs_fold.keys())),
+        flat_units=flat_units,
+        flat_procs=flat_procs,
+        unit_tokens=_alias_tokens(aliases_per_unit) if fuzz is None else None,
+        proc_tokens=_alias_tokens(aliases_per_proc) if fuzz is None else None,
+        unit_filter=_alias_filter(flat_units[0]),
+        proc_filter=_alias_filter(flat_procs[0]),
+    )
+
+# unit/procedure index of the last catalog seen
+_UNIT_PROC_INDEX_CACHE: helpers.LastObjectCache[_UnitProcIndex] = helpers.LastObjectCache(_build_unit_proc_index)
+
+def _unit_proc_index_for(catalog) -> _UnitProcIndex:
+    return _UNIT_PROC_INDEX_CACHE.get(catalog)
+
+
+def find_units_and_procedures_anchors(soup: BeautifulSoup, catalog) -> List[Anchor]:
+    """
+    DET: aliasy/etykiety po foldzie; wrap tylko dokładny span.
+    FUZZ: if nothing found in DET tag – pick best alias > 0.85;
+          if procedure has acronym/s, fuzzy requires coverage (stub).
+    """
+    anchors: List[Anchor] = []
 
+    idx = _unit_proc_index_for(catalog)
+    units_fold, procs_fold = idx.units_fold, idx.procs_fold
+    proc_id_to_name, unit_id_to_name = idx.proc_id_to_name, idx.unit_id_to_name
+    procs_acronyms = idx.procs_acronyms
+    aliases_per_unit, aliases_per_proc = idx.aliases_per_unit, idx.aliases_per_proc
+    units_rx, procs_rx = idx.units_rx, idx.procs_rx
+    flat_units, flat_procs = idx.flat_units, idx.flat_procs
+    unit_tokens, proc_tokens = idx.unit_tokens, idx.proc_tokens
+    unit_filter, proc_filter = idx.unit_filter, idx.proc_filter
+
+    # DET mutates the tree, so it stays sequential; blocks without DET hits queue their
+    # text (captured now: later splits would change get_text separators) for batched FUZZ
+    per_block: List[List[Anchor]] = []
+    pending: List[Tuple[int, Tag, str]] = []
     for block in _iter_blocks(soup):
-        det_u = _det_in_tag_for_map(
-            soup, block, units_fold, kind="unit", source_label="label",
+        det_u, block_text = _det_in_tag_for_map(
+            soup, block, units_fold, units_rx, kind="unit", source_label="label",
             id_to_name=unit_id_to_name
         )
-        det_p = _det_in_tag_for_map(
-            soup, block, procs_fold, kind="procedure", source_label="alias",
+        det_p, _ = _det_in_tag_for_map(
+            soup, block, procs_fold, procs_rx, kind="procedure", source_label="alias",
             id_to_name=proc_id_to_name
         )
 
         if det_u or det_p:
-            anchors.extend(det_u)
-            anchors.extend(det_p)
+            per_block.append(det_u + det_p)
             continue
 
-
-        best_p = _fuzz_in_tag_for_map(
-            block, procs_fold, aliases_per_proc,
-            require_acronym_ok=procs_acronyms,
-            fuzz_threshold=0.85,
-        )
+        # no DET hit -> the tree under block is untouched and the DET walk's text is current
+        if block_text is None:
+            block_text = block.get_text(" ", strip=True)
+        per_block.append([])
+        pending.append((len(per_block) - 1, block, block_text))
+
+
+    texts = [text for _, _, text in pending]
+    best_ps = _fuzz_many_for_map(
+        texts, aliases_per_proc,
+        require_acronym_ok=procs_acronyms,
+        fuzz_threshold=0.85,
+        flat_aliases=flat_procs,
+        alias_tokens_by_id=proc_tokens,
+        alias_filter=proc_filter,
+    )
+    unit_rows = [i for i, best_p in enumerate(best_ps) if not best_p]
+    best_us = dict(zip(unit_rows, _fuzz_many_for_map(
+        [texts[i] for i in unit_rows], aliases_per_unit,
+        require_acronym_ok=None,
+        fuzz_threshold=0.85,
+        flat_aliases=flat_units,
+        alias_tokens_by_id=unit_tokens,
+        alias_filter=unit_filter,
+    )))
+
+    for i, (slot, block, _) in enumerate(pending):
+        best_p = best_ps[i]
         if best_p:
             pid, alias_used, score = best_p
             span_node = block
-            anchors.append(Anchor(
+            per_block[slot].append(Anchor(
                 name=proc_id_to_name.get(pid),
                 kind="procedure",
                 per_id=str(pid),
@@ -247,15 +519,11 @@ def find_units_and_procedures_anchors(soup: BeautifulSoup, catalog) -> List[Anch
             continue
 
 
-        best_u = _fuzz_in_tag_for_map(
-            block, units_fold, aliases_per_unit,
-            require_acronym_ok=None,
-            fuzz_threshold=0.85,
-        )
+        best_u = best_us.get(i)
         if best_u:
             uid, alias_used, score = best_u
             span_node = block
-            anchors.append(Anchor(
+            per_block[slot].append(Anchor(
                 name=unit_id_to_name.get(uid),
                 kind="unit",
                 per_id=str(uid),
@@ -266,6 +534,9 @@ def find_units_and_procedures_anchors(soup: BeautifulSoup, catalog) -> List[Anch
                 score=round(float(score), 3),
             ))
 
+    for block_anchors in per_block:
+        anchors.extend(block_anchors)
+
     return anchors
 
 
@@ -275,8 +546,9 @@ def find_anchors(soup: BeautifulSoup) -> Tuple[List[Anchor], List[Anchor]]:
     1) people
     2) units + procedures (DET → FUZZ)
     """
-    cat = load_catalog()
-    people_anchors, dropped_people = find_people_anchors(soup)
+    _ascii_fold_with_map_cached.cache_clear()
+    cat = get_catalog()
+    people_anchors, dropped_people = find_people_anchors(soup, cat)
     up_anchors = find_units_and_procedures_anchors(soup, cat)
     anchors = people_anchors + up_anchors
     return anchors, dropped_people
\ No newline at end of file
@@ -5,18 +5,39 @@ This module traverses the DOM tree while maintaining a stack of ancestor heading
 (breadcrumbs), and groups all content elements with identical breadcrumbs into blocks.
 """
 
-from bs4 import BeautifulSoup, Tag, NavigableString
-from typing import List, Dict, Any
+from bs4 import BeautifulSoup, Tag, NavigableString, Comment, SoupStrainer
+from typing import List, Dict, Any, Optional, Tuple
 import re
+import sys
 from knowledge.pipeline.data_models import Block
 from knowledge.pipeline.html_utils import decode_html_entities
 
 
+_WS_RE = re.compile(r'\s+')
+
+# headings longer than this are unlikely to repeat across pages; not worth interning
+_INTERN_MAX_LEN = 256
+
+_HEADING_LEVELS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+_LIST_TAGS = frozenset({'ul', 'ol'})
+# tags with their own branch in extract_content_elements; everything else is only descended into
+_HANDLED_TAGS = frozenset(_HEADING_LEVELS) | _LIST_TAGS | {'table', 'p', 'div'}
+
+# only these subtrees get bs4 objects; everything the splitter reads lives under <body>,
+# so <head> (title, meta, inline scripts/styles) is no longer materialized
+_STRAINER = SoupStrainer(name=frozenset({
+    'main', 'article', 'body', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'ul', 'ol', 'li',
+    'table', 'tr', 'td', 'th', 'div', 'section', 'header', 'footer', 'nav', 'aside',
+}))
+
+
 class HeadingStack:
     """Manages the heading hierarchy stack during DOM traversal."""
 
     def __init__(self):
-        self.stack: List[Dict[str, Any]] = []
+        # (level, text) entries: immutable, so copies and snapshots can share them
+        self.stack: List[Tuple[int, str]] = []
+        self._snapshot: Optional[Tuple[str, List[str]]] = None
 
     def push(self, level: int, text: str):
         """
@@ -29,21 +50,36 @@ class HeadingStack:
             level: Heading level (1-6 for h1-h6)
             text: Cleaned heading text
         """
-        while self.stack and self.stack[-1]['level'] >= level:
+        while self.stack and self.stack[-1][0] >= level:
             self.stack.pop()
 
 
-        self.stack.append({'level': level, 'text': text})
+        # the same headings ("Dziekanat", faculty names) recur in every block and chunk of a site
+        if len(text) < _INTERN_MAX_LEN:
+            text = sys.intern(text)
+        self.stack.append((level, text))
+        self._snapshot = None
+
+    def snapshot(self) -> Tuple[str, List[str]]:
+        """
+        Get (breadcrumb key, breadcrumbs) for the current path.
+
+        Computed once per push and shared by every caller until the next one,
+        so the returned list must be treated as read-only.
+        """
+        if self._snapshot is None:
+            crumbs = [text for _, text in self.stack]
+            key = "::".join(crumbs) if crumbs else "__no_heading__"
+            self._snapshot = (key, crumbs)
+        return self._snapshot
 
     def get_breadcrumbs(self) -> List[str]:
         """Get the current breadcrumb path as a list of heading texts."""
-        return [h['text'] for h in self.stack]
+        return self.snapshot()[1].copy()
 
     def get_breadcrumb_key(self) -> str:
         """Get a unique string key for the current breadcrumbs."""
-        if not self.stack:
-            return "__no_heading__"
-        return "::".join(self.get_breadcrumbs())
+        return self.snapshot()[0]
 
     def is_empty(self) -> bool:
         """Check if the stack is empty."""
@@ -52,7 +88,7 @@ class HeadingStack:
     def copy(self) -> 'HeadingStack':
         """Create a copy of the current stack."""
         new_stack = HeadingStack()
-        new_stack.stack = [h.copy() for h in self.stack]
+        new_stack.stack = list(self.stack)
         return new_stack
 
 
@@ -70,8 +106,9 @@ def clean_heading_text(heading: Tag) -> str:
         return ""
 
     text = heading.get_text(separator=' ', strip=True)
-    text = decode_html_entities(text)
-    text = re.sub(r'\s+', ' ', text)
+    if '&' in text:
+        text = decode_html_entities(text)
+    text = _WS_RE.sub(' ', text)
     return text.strip()
 
 
@@ -85,12 +122,14 @@ def clean_text(text: str) -> str:
     Returns:
         Cleaned text with decoded entities
     """
-    text = decode_html_entities(text)
-    text = re.sub(r'\s+', ' ', text)
+    # lxml already decoded the markup; only double-escaped text (&amp;amp;) is left, and it needs '&'
+    if '&' in text:
+        text = decode_html_entities(text)
+    text = _WS_RE.sub(' ', text)
     return text.strip()
 
 
-def extract_content_elements(soup: BeautifulSoup, heading_stack: HeadingStack) -> Dict[str, List[Dict[str, Any]]]:
+def extract_content_elements(soup: BeautifulSoup, heading_stack: HeadingStack) -> Dict[str, Dict[str, Any]]:
     """
     Traverse the DOM and group content elements by their breadcrumb path.
 
@@ -102,108 +141,107 @@ def extract_content_elements(soup: BeautifulSoup, heading_stack: HeadingStack) -
         heading_stack: HeadingStack to track breadcrumbs
 
     Returns:
-        Dictionary mapping breadcrumb keys to lists of content elements
+        Dictionary mapping breadcrumb keys to column groups:
+        {'types': [...], 'texts': [...], 'breadcrumbs': [...]} with one breadcrumbs list per group
     """
-    grouped_content: Dict[str, List[Dict[str, Any]]] = {}
+    grouped_content: Dict[str, Dict[str, Any]] = {}
 
     def add_content_element(element_type: str, text: str, breadcrumb_key: str, breadcrumbs: List[str]):
         """Helper to add a content element to the grouped_content."""
-        if breadcrumb_key not in grouped_content:
-            grouped_content[breadcrumb_key] = []
+        group = grouped_content.get(breadcrumb_key)
+        if group is None:
+            group = grouped_content[breadcrumb_key] = {'types': [], 'texts': [], 'breadcrumbs': breadcrumbs}
 
-        grouped_content[breadcrumb_key].append({
-            'type': element_type,
-            'text': text,
-            'breadcrumbs': breadcrumbs.copy()
-        })
+        group['types'].append(element_type)
+        group['texts'].append(text)
 
     def has_direct_text_content(element: Tag) -> bool:
         """Check if element has direct text content (not just in children)."""
         if not isinstance(element, Tag):
             return False
-        for child in element.children:
-            if isinstance(child, NavigableString):
-                text = str(child).strip()
-                if text and not text.startswith('<!--'):
-                    return True
-        return False
-
-    def process_element(element):
-        """Recursively process HTML elements."""
-        if isinstance(element, NavigableString):
-            return
+        # comments are parsed as Comment nodes whose text has no '<!--', so check the class
+        return any(
+            isinstance(child, NavigableString)
+            and not isinstance(child, Comment)
+            and (text := child.strip())
+            and not text.startswith('<!--')
+            for child in element.children
+        )
+
+    # explicit pre-order DFS (children pushed reversed) instead of recursing per element;
+    # the heading stack is only pushed in document order, so no per-frame state is needed.
+    # Not find_all(<handled tags>): that walks every subtree, including the p/li/table contents
+    # this loop never enters, and would need ancestor checks to skip nested hits.
+    stack: List[Any] = [soup]
+    while stack:
+        element = stack.pop()
 
         if not isinstance(element, Tag):
-            return
+            continue
 
-        if element.name in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
-            level = int(element.name[1])
+        name = element.name
+        if name not in _HANDLED_TAGS:
+            stack.extend(reversed(element.contents))
+            continue
+
+        level = _HEADING_LEVELS.get(name)
+        if level is not None:
             heading_text = clean_heading_text(element)
 
             if heading_text:
                 heading_stack.push(level, heading_text)
-            return
+            continue
 
 
-        if element.name in ('ul', 'ol'):
+        if name in _LIST_TAGS:
             for li in element.find_all('li', recursive=False):
                 text = clean_text(li.get_text(separator=' ', strip=True))
                 if text:
-                    breadcrumb_key = heading_stack.get_breadcrumb_key()
-                    breadcrumbs = heading_stack.get_breadcrumbs()
+                    breadcrumb_key, breadcrumbs = heading_stack.snapshot()
                     add_content_element('list_item', text, breadcrumb_key, breadcrumbs)
-            return
+            continue
 
 
-        if element.name == 'table':
+        if name == 'table':
             for row in element.find_all('tr'):
                 cells = row.find_all(['td', 'th'])
                 if cells:
-                    row_text = ' | '.join(clean_text(cell.get_text(separator=' ', strip=True)) for cell in cells)
+                    # one clean_text per row: '|' survives the whitespace collapse
+                    row_text = clean_text(' | '.join(cell.get_text(separator=' ', strip=True) for cell in cells))
                     if row_text:
-                        breadcrumb_key = heading_stack.get_breadcrumb_key()
-                        breadcrumbs = heading_stack.get_breadcrumbs()
+                        breadcrumb_key, breadcrumbs = heading_stack.snapshot()
                         add_content_element('table_row', row_text, breadcrumb_key, breadcrumbs)
-            return
+            continue
 
-        if element.name == 'p':
+        if name == 'p':
             text = clean_text(element.get_text(separator=' ', strip=True))
             if text:
-                breadcrumb_key = heading_stack.get_breadcrumb_key()
-                breadcrumbs = heading_stack.get_breadcrumbs()
+                breadcrumb_key, breadcrumbs = heading_stack.snapshot()
                 add_content_element('paragraph', text, breadcrumb_key, breadcrumbs)
-            return
-
-        if element.name in ('div', 'section', 'article', 'main', 'body', 'header', 'footer', 'nav', 'aside'):
-            if has_direct_text_content(element) and element.name == 'div':
-                text = clean_text(element.get_text(separator=' ', strip=True))
-                if text:
-                    breadcrumb_key = heading_stack.get_breadcrumb_key()
-                    breadcrumbs = heading_stack.get_breadcrumbs()
-                    add_content_element('paragraph', text, breadcrumb_key, breadcrumbs)
-                return
-
-            for child in element.children:
-                process_element(child)
-            return
+            continue
 
-        for child in element.children:
-            process_element(child)
+        if name == 'div' and has_direct_text_content(element):
+            text = clean_text(element.get_text(separator=' ', strip=True))
+            if text:
+                breadcrumb_key, breadcrumbs = heading_stack.snapshot()
+                add_content_element('paragraph', text, breadcrumb_key, breadcrumbs)
+            continue
 
-    process_element(soup)
+        stack.extend(reversed(element.contents))
 
     return grouped_content
 
 
 def create_blocks_from_grouped_content(
-    grouped_content: Dict[str, List[Dict[str, Any]]],
+    grouped_content: Dict[str, Dict[str, Any]],
     source_url: str
 ) -> List[Block]:
     """
     Create Block objects from grouped content.
 
     Args:
-        grouped_content: Dictionary mapping breadcrumb keys to content elements
+        grouped_content: Dictionary mapping breadcrumb keys to column groups
+            (see extract_content_elements)
         source_url: Source URL/filename
 
     Returns:
@@ -211,11 +249,16 @@ def create_blocks_from_grouped_content(
     """
     blocks = []
 
-    for breadcrumb_key, content_elements in grouped_content.items():
-        if not content_elements:
+    for breadcrumb_key, group in grouped_content.items():
+        if not group['texts']:
             continue
 
-        breadcrumbs = content_elements[0]['breadcrumbs']
+        breadcrumbs = group['breadcrumbs']
+        # Block keeps its element-dict API; the dicts are built once here, per block
+        content_elements = [
+            {'type': element_type, 'text': text, 'breadcrumbs': breadcrumbs}
+            for element_type, text in zip(group['types'], group['texts'])
+        ]
 
         block = Block(
             block_id='',
@@ -244,17 +287,23 @@ def split_html_into_blocks(html_content: str, source_url: str) -> List[Block]:
     The breadcrumb hierarchy can be irregular (e.g., h1→h3, h2→h5) - it just
     records whatever ancestor headings exist above each content element.
     """
-    soup = BeautifulSoup(html_content, 'lxml')
+    soup = BeautifulSoup(html_content, 'lxml', parse_only=_STRAINER)
 
 
     heading_stack = HeadingStack()
 
 
-    for h1 in soup.find_all('h1', limit=5):
+    h1 = soup.find('h1')
+    if h1 is not None:
         heading_text = clean_heading_text(h1)
+        if not heading_text:
+            # rare: an empty first h1 (logo/icon); look at the next ones, up to five overall
+            for h1 in h1.find_all_next('h1', limit=4):
+                heading_text = clean_heading_text(h1)
+                if heading_text:
+                    break
         if heading_text:
             heading_stack.push(1, heading_text)
-            break
 
 
     main_content = soup.find('main') or soup.find('article') or soup.body or soup
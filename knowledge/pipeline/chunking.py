@@ -5,7 +5,9 @@ This module takes Block objects and converts them into Chunk objects
 with breadcrumb context for embedding.
 """
 
-from typing import List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import functools
 import re
 import nltk
 from knowledge.pipeline.data_models import Block, Chunk, ChunkingConfig
@@ -19,40 +21,93 @@ except LookupError:
     nltk.download('punkt_tab', quiet=True)
 
 
+_LEADING_DIGITS_RE = re.compile(r'\d+')
+
+_SHORT_PARAGRAPH_WORDS = 20
+# sentence-final characters for _is_fragment ('...' ends with '.', so it is covered)
+_FRAGMENT_TERMINALS = frozenset('.!?:')
+
+
+def _count_words(text: str, cap: Optional[int] = None) -> int:
+    """
+    Whitespace word count; with cap, counts at most cap + 1 words, so only that many
+    substrings are allocated (enough for a "more than cap words?" check on long paragraphs).
+    """
+    if cap is None:
+        return len(text.split())
+    return len(text.split(None, cap))
+
+
+@functools.lru_cache(maxsize=1)
+def _get_sent_tokenizer():
+    """Polish Punkt model, unpickled once per process and shared by all Chunkers."""
+    return nltk.data.load('tokenizers/punkt/polish.pickle')
+
+
+# boilerplate paragraphs (footers, cookie notes, contact lines) repeat across pages and blocks
+@functools.lru_cache(maxsize=4096)
+def _split_sentences(text: str) -> Tuple[str, ...]:
+    """Punkt sentences of text, memoized per process; a tuple so cached results stay immutable."""
+    return tuple(_get_sent_tokenizer().tokenize(text))
+
+
 class Chunker:
     """Extracts chunks from blocks."""
 
     def __init__(self, config: Optional[ChunkingConfig] = None):
         self.config = config or ChunkingConfig()
-        self.sent_tokenizer = nltk.data.load('tokenizers/punkt/polish.pickle')
+        self.sent_tokenizer = _get_sent_tokenizer()
+        self._metadata_res = self._compile_metadata_patterns(self.config.metadata_patterns)
+        self._generic_headings = frozenset(self.config.generic_headings)
+
+    @staticmethod
+    def _compile_metadata_patterns(patterns) -> List[re.Pattern]:
+        """
+        Compile metadata patterns once, as a single alternation when they combine
+        (one scan per chunk); patterns that cannot be joined (e.g. inline global flags)
+        are compiled one by one.
+        """
+        patterns = list(patterns or [])
+        if not patterns:
+            return []
+        try:
+            return [re.compile('|'.join(f'(?:{p})' for p in patterns), re.IGNORECASE)]
+        except re.error:
+            return [re.compile(p, re.IGNORECASE) for p in patterns]
 
     def chunk_block(self, block: Block) -> List[Chunk]:
         """
         Extract chunks from a block with breadcrumb context.
         """
         chunks = []
+        # one copy per block, shared by all of its chunks (read-only downstream)
+        breadcrumbs = block.breadcrumbs.copy()
 
         for element in block.content_elements:
             element_type = element['type']
             text = element['text']
 
             if element_type == 'paragraph':
-                word_count = len(text.split())
-                if word_count <= 20 and block.breadcrumbs:
+                word_count = _count_words(text, cap=_SHORT_PARAGRAPH_WORDS)
+                if word_count <= _SHORT_PARAGRAPH_WORDS and block.breadcrumbs:
+                    # under the cap the count is exact, so _create_chunk does not count again
                     chunk = self._create_chunk(
                         text,
                         'paragraph',
-                        block
+                        block,
+                        word_count=word_count,
+                        breadcrumbs=breadcrumbs
                     )
                     if chunk:
                         chunks.append(chunk)
                 else:
-                    sentences = self.sent_tokenizer.tokenize(text)
+                    sentences = _split_sentences(text)
                     for sentence in sentences:
                         chunk = self._create_chunk(
                             sentence.strip(),
                             'sentence',
-                            block
+                            block,
+                            breadcrumbs=breadcrumbs
                         )
                         if chunk:
                             chunks.append(chunk)
@@ -61,7 +116,8 @@ class Chunker:
                 chunk = self._create_chunk(
                     text,
                     'list_item',
-                    block
+                    block,
+                    breadcrumbs=breadcrumbs
                 )
                 if chunk:
                     chunks.append(chunk)
@@ -70,18 +126,20 @@ class Chunker:
                 chunk = self._create_chunk(
                     text,
                     'table_row',
-                    block
+                    block,
+                    breadcrumbs=breadcrumbs
                 )
                 if chunk:
                     chunks.append(chunk)
 
             elif element_type == 'text':
-                sentences = self.sent_tokenizer.tokenize(text)
+                sentences = _split_sentences(text)
                 for sentence in sentences:
                     chunk = self._create_chunk(
                         sentence.strip(),
                         'sentence',
-                        block
+                        block,
+                        breadcrumbs=breadcrumbs
                     )
                     if chunk:
                         chunks.append(chunk)
@@ -92,7 +150,9 @@ class Chunker:
         self,
         content: str,
         element_type: str,
-        block: Block
+        block: Block,
+        word_count: Optional[int] = None,
+        breadcrumbs: Optional[List[str]] = None
     ) -> Optional[Chunk]:
         """
         Create a Chunk object from content.
@@ -101,6 +161,8 @@ class Chunker:
             content: The text content
             element_type: Type of element (sentence, list_item, table_row)
             block: Parent block
+            word_count: Word count of content if the caller already has it
+            breadcrumbs: Copy of block.breadcrumbs to store on the chunk (shared per block)
 
         Returns:
             Chunk object or None if filtered out
@@ -110,7 +172,8 @@ class Chunker:
         if not content:
             return None
 
-        word_count = len(content.split())
+        if word_count is None:
+            word_count = _count_words(content)
 
 
         if element_type in ('list_item', 'table_row'):
@@ -136,7 +199,7 @@ class Chunker:
                     return None
 
 
-        if content.strip() in self.config.generic_headings:
+        if content in self._generic_headings:
             return None
 
 
@@ -144,17 +207,20 @@ class Chunker:
             return None
 
 
-        embedding_text = self._create_embedding_text(block.breadcrumbs, content)
+        if breadcrumbs is None:
+            breadcrumbs = block.breadcrumbs.copy()
+
+        embedding_text = self._create_embedding_text(breadcrumbs, content)
 
 
         chunk = Chunk(
             chunk_id='',
-            breadcrumbs=block.breadcrumbs.copy(),
+            breadcrumbs=breadcrumbs,
             content=content,
             embedding_text=embedding_text,
             parent_block_id=block.block_id,
             metadata={
-                'breadcrumbs': block.breadcrumbs.copy(),
+                'breadcrumbs': breadcrumbs,
                 'element_type': element_type,
                 'word_count': word_count,
                 'source_url': block.source_url,
@@ -182,42 +248,77 @@ class Chunker:
 
     def _is_metadata_line(self, text: str) -> bool:
         """Check if text looks like metadata."""
-        for pattern in self.config.metadata_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return True
-        return False
+        return any(rx.search(text) for rx in self._metadata_res)
 
     def _is_fragment(self, text: str) -> bool:
         """Check if text is a sentence fragment."""
-        if text and text[0].islower():
+        if not text:
             return True
-
-        if len(text.split()) <= 3 and not text.rstrip().endswith(('.', '!', '?', ':', '...')):
+        if text[0].islower():
             return True
 
+        if _count_words(text, cap=3) <= 3:
+            last = text[-1]
+            if last.isspace():
+                last = text.rstrip()[-1:]
+            return last not in _FRAGMENT_TERMINALS
+
         return False
 
     def _is_meaningful_single_word(self, text: str) -> bool:
         """Check if a single word is meaningful enough to keep."""
-        if re.match(r'\d+', text):
+        if _LEADING_DIGITS_RE.match(text):
             return True
         return False
 
 
-def chunk_blocks(blocks: List[Block], config: Optional[ChunkingConfig] = None) -> List[Chunk]:
+_PARALLEL_MIN_BLOCKS = 256
+_PARALLEL_CHUNKSIZE = 64
+
+# per-process Chunker of a chunk_blocks worker pool (Punkt loaded once per worker)
+_WORKER_CHUNKER: Optional[Chunker] = None
+
+
+def _init_chunk_worker(config: Optional[ChunkingConfig]) -> None:
+    global _WORKER_CHUNKER
+    _WORKER_CHUNKER = Chunker(config)
+
+
+def _chunk_block_in_worker(block: Block) -> List[Chunk]:
+    return _WORKER_CHUNKER.chunk_block(block)
+
+
+def chunk_blocks(
+    blocks: List[Block],
+    config: Optional[ChunkingConfig] = None,
+    workers: Optional[int] = None,
+) -> List[Chunk]:
     """
     Convenience function to chunk multiple blocks.
 
     Args:
         blocks: List of Block objects
         config: Optional ChunkingConfig
+        workers: Number of worker processes for large block lists
+            (corpus-scale runs); None or 1 chunks in-process
 
     Returns:
-        List of all Chunk objects from all blocks
+        List of all Chunk objects from all blocks, in block order
     """
-    chunker = Chunker(config)
     all_chunks = []
 
+    if workers and workers > 1 and len(blocks) >= _PARALLEL_MIN_BLOCKS:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_chunk_worker,
+            initargs=(config,),
+        ) as ex:
+            for chunks in ex.map(_chunk_block_in_worker, blocks, chunksize=_PARALLEL_CHUNKSIZE):
+                all_chunks.extend(chunks)
+        return all_chunks
+
+    chunker = Chunker(config)
+
     for block in blocks:
         chunks = chunker.chunk_block(block)
         all_chunks.extend(chunks)
@@ -0,0 +1,35 @@
+"""_ascii_fold_with_map on fixed inputs: folded text and the folded-index -> casefolded-source-index map."""
+from knowledge.helpers.ascii_fold import _ascii_fold, _ascii_fold_with_map, _ascii_fold_with_map_cached
+
+CASES = [
+    ("", "", []),
+    ("Dziekanat FTIMS", "dziekanat ftims", list(range(15))),
+    # polish diacritics fold 1:1; 'ł' has no NFKD decomposition and stays
+    ("Łódź", "łodz", [0, 1, 2, 3]),
+    ("ZAŻÓŁĆ", "zazołc", [0, 1, 2, 3, 4, 5]),
+    # casefold expands the ligature, indices refer to the casefolded source
+    ("ﬁ", "fi", [0, 1]),
+    ("Straße", "strasse", [0, 1, 2, 3, 4, 5, 6]),
+    # one source char folding to several
+    ("½ etatu", "1⁄2 etatu", [0, 0, 0, 1, 2, 3, 4, 5, 6]),
+    ("a…b", "a...b", [0, 1, 1, 1, 2]),
+    # combining marks are dropped, including a lone one
+    ("éle", "ele", [0, 2, 3]),
+    ("́x", "x", [1]),
+]
+
+
+def test_fold_with_map():
+    for raw, norm, n2o in CASES:
+        assert _ascii_fold_with_map(raw) == (norm, n2o), raw
+
+
+def test_cached_fold_returns_tuple_map():
+    for raw, norm, n2o in CASES:
+        assert _ascii_fold_with_map_cached(raw) == (norm, tuple(n2o)), raw
+
+
+def test_fold_strips_and_matches_map_text():
+    assert _ascii_fold("  Dr inż. Łukasz  ") == "dr inz. łukasz"
+    for raw, norm, _ in CASES:
+        assert _ascii_fold(raw) == norm.strip(), raw
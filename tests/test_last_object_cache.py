@@ -0,0 +1,42 @@
+"""LastObjectCache (catalog-derived indices): identity hits, a rebuilt catalog gets a fresh index."""
+from knowledge.helpers.helpers import LastObjectCache
+
+
+def _counting_cache():
+    builds = []
+
+    def build(catalog):
+        builds.append(catalog)
+        return {"by_name": dict(catalog["people"])}
+
+    return LastObjectCache(build), builds
+
+
+def test_same_catalog_reuses_index():
+    cache, builds = _counting_cache()
+    catalog = {"people": {"jan kowalski": 1}}
+    assert cache.get(catalog) is cache.get(catalog)
+    assert len(builds) == 1
+
+
+def test_rebuilt_catalog_gets_fresh_index():
+    cache, builds = _counting_cache()
+    old = {"people": {"jan kowalski": 1}}
+    old_index = cache.get(old)
+    del old
+    # equal content (and possibly the freed object's id) must not serve the old index
+    rebuilt = {"people": {"jan kowalski": 1, "anna nowak": 2}}
+    new_index = cache.get(rebuilt)
+    assert new_index is not old_index
+    assert new_index == {"by_name": {"jan kowalski": 1, "anna nowak": 2}}
+    assert len(builds) == 2
+
+
+def test_clear_rebuilds_after_in_place_edit():
+    cache, builds = _counting_cache()
+    catalog = {"people": {"jan kowalski": 1}}
+    cache.get(catalog)
+    catalog["people"]["anna nowak"] = 2
+    cache.clear()
+    assert cache.get(catalog) == {"by_name": {"jan kowalski": 1, "anna nowak": 2}}
+    assert len(builds) == 2
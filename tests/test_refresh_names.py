@@ -0,0 +1,25 @@
+"""Name cleanup in refresh_data: whitespace padding is stripped like str.strip(), not SQL TRIM()."""
+import pytest
+
+pytest.importorskip("psycopg")
+pytest.importorskip("dotenv")
+
+from input.neon_database.refresh_data import fold_text, person_names, strip_or_empty
+
+
+def test_strip_or_empty_drops_tabs_and_newlines():
+    assert strip_or_empty(None) == ""
+    assert strip_or_empty("\tDziekanat FTIMS\n") == "Dziekanat FTIMS"
+    assert strip_or_empty(" Biuro\r\n") == "Biuro"
+
+
+def test_person_names_padding_and_fallback():
+    assert person_names("Jan Kowalski\n", "\tJan", "Kowalski ") == ("Jan Kowalski", "Jan", "Kowalski")
+    # whitespace-only full_name falls back to "first last"
+    assert person_names(" \t\n", "Anna", "Nowak\t") == ("Anna Nowak", "Anna", "Nowak")
+    assert person_names(None, None, None) == ("", "", "")
+
+
+def test_padded_name_folds_like_clean_one():
+    full, _, _ = person_names("Łukasz Żółć\t", None, None)
+    assert fold_text(full) == "łukasz zołc"